@@ -129,12 +129,10 @@ def create_intervals(activity_type, strain, mouse, day):
 
     """
 
-    # Load intervals by activity type
-    l_ints = data.load_intervals(activity_type)
-
-    # Subset to M*2 array of  (start, stop) intervals based on
-    # specific mouse, strain and day
-    l_ints = _select_strain_mouse_day_in_data_frame(l_ints, strain, mouse, day)
+    # Load intervals by activity type for the specific mouse, strain and
+    # day, as an M*2 array of (start, stop) intervals
+    l_ints = data.load_intervals(activity_type, strain=strain, mouse=mouse,
+                                 day=day)
     l_ints = l_ints[['start', 'stop']]
 
     # Create and return the intervals object
@@ -2,19 +2,117 @@ from __future__ import (absolute_import, division,
                         print_function, unicode_literals)
 
 import os as _os
+from multiprocessing import cpu_count as _cpu_count
+from multiprocessing.pool import ThreadPool as _ThreadPool
 
 import numpy as np
 import pandas as pd
 
 from mousestyles import data_dir
-from mousestyles.intervals import Intervals
+from mousestyles.intervals import Intervals, IntervalsCollection
+from mousestyles.data.packed import (pack_movement, load_movement_view,
+                                     has_packed_movement, pack_intervals,
+                                     load_intervals_view,
+                                     has_packed_intervals, select_keys)
+from mousestyles.data.packed import (_store_paths, _packed_movement,
+                                     _scan_keys, _interval_file,
+                                     _movement_file,
+                                     pack_all_features,
+                                     long_features_table,
+                                     ALL_FEATURES_PATH,
+                                     ALL_FEATURES_LONG_PATH)
+from mousestyles.data.cache import (cached, cache_info, clear_cache,
+                                    set_cache_budget)
+from mousestyles.data.catalog import DatasetCatalog
 import collections
 
 from matplotlib.externals import six
 
 INTERVAL_FEATURES = ["AS", "F", "IS", "M_AS", "M_IS", "W"]
 
+PRECISIONS = ["full", "compact"]
 
+# dtypes of the strain, mouse and day columns in compact precision
+COMPACT_KEY_DTYPES = [("strain", np.uint8), ("mouse", np.uint16),
+                      ("day", np.uint8)]
+
+
+def _features_sources(*args, **kwargs):
+    return [ALL_FEATURES_PATH, ALL_FEATURES_LONG_PATH]
+
+
+def _intervals_sources(feature, strain=None, mouse=None, day=None,
+                       precision="full"):
+    directory = _os.path.join(data_dir, "intervals", feature)
+    try:
+        keys = np.array(_scan_keys(directory)).reshape(-1, 3)
+    except OSError:
+        keys = np.zeros((0, 3), dtype=np.int64)
+    keys = keys[select_keys(keys, strain, mouse, day)]
+    # the directory tracks added and removed files, the files themselves
+    # the ones rewritten in place
+    return [directory, _store_paths(None, 'intervals_' + feature)[1]] + \
+        [_interval_file(feature, key) for key in keys.tolist()]
+
+
+def _movement_sources(strain, mouse, day, precision="full"):
+    return [_os.path.join(data_dir, "txy_coords", column,
+                          "{}_strain{}_mouse{}_day{}.npy".format(
+                              column, strain, mouse, day))
+            for column in ["C_idx_HB", "CT", "CX", "CY"]] + \
+        [_store_paths(None, 'movement')[1]]
+
+
+def _catalog_sources(*args, **kwargs):
+    directory = _os.path.join(data_dir, "txy_coords", "CT")
+    try:
+        keys = _scan_keys(directory)
+    except OSError:
+        keys = []
+    # the directories track added and removed mouse-days, the files the
+    # ones rewritten in place
+    return [directory,
+            _os.path.join(data_dir, "txy_coords",
+                          "recordingStartTimeEndTime"),
+            _store_paths(None, 'movement')[1]] + \
+        [_movement_file("CT", key) for key in keys] + \
+        [_start_time_end_time_file(*key) for key in keys]
+
+
+def _start_time_end_time_file(strain, mouse, day):
+    return _os.path.join(data_dir, 'txy_coords',
+                         'recordingStartTimeEndTime',
+                         'recordingStartTimeEndTime_strain{}_mouse{}_day{}'
+                         '.npy'.format(strain, mouse, day))
+
+
+def _start_time_end_time_sources(strain, mouse, day):
+    return [_start_time_end_time_file(strain, mouse, day)]
+
+
+@cached(_catalog_sources)
+def load_catalog():
+    """
+    Return the DatasetCatalog of the mouse-days in the data directory.
+    The catalog is built once and rebuilt only when files are added to
+    or removed from the data directory.
+
+    Returns
+    -------
+    catalog : DatasetCatalog
+        valid (strain, mouse, day) keys, sample counts and recording
+        start and end times of every mouse-day
+
+    Examples
+    --------
+    >>> catalog = load_catalog()
+    >>> catalog.mice(0)
+    [0, 1, 2, 3]
+    """
+    return DatasetCatalog()
+
+
+@cached(_features_sources)
 def load_all_features():
     """
     Returns a (21131, 13) size pandas.DataFrame object corresponding to
@@ -23,57 +121,36 @@ def load_all_features():
 
     Column 0: the strain of the mouse (0-15)
     Column 1: the mouse number (number depends on strain)
-    Column 2: the day number (5-16)
+    Column 2: the day number (0-11)
     Column 3: the 2-hour time bin (e.g., value 4 corresponds to hours 4 to 6)
 
-    The remaining 9 columns are the computed features.
+    The key columns are stored as small unsigned integers (uint8 for
+    strain, day and hour, uint16 for mouse).  The remaining 9 columns
+    are the computed features.
+
+    If the long table has been saved by `pack_all_features` and is newer
+    than all_features_mousedays_11bins.npy, it is read from that file
+    instead of being reshaped again.
 
     Returns
     -------
     features_data_frame : pandas.DataFrame
         A dataframe of computed features.
     """
-    features = [
-        'ASProbability',
-        'ASNumbers',
-        'ASDurations',
-        'Food',
-        'Water',
-        'Distance',
-        'ASFoodIntensity',
-        'ASWaterIntensity',
-        'MoveASIntensity']
-
-    # 9 x 1921 x (3 labels + 11 feature time bins)
-    all_features = np.load(
-        _os.path.join(
-            data_dir,
-            'all_features_mousedays_11bins.npy'))
-
-    # Here we begin reshaping the 3-d numpy array into a pandas 2-d dataframe
-    columns = ['strain', 'mouse', 'day']
-    # Append 2-hour time bin values
-    columns += list(range(0, 22, 2))
-
-    # For each feature, unpivot its dataframe so that the 2-hour
-    # time bins become a value column, rather than a dimension
-    data_frames = []
-    for (i, feature) in enumerate(features):
-        df = pd.DataFrame(data=all_features[i, :, :], columns=columns)
-        melted_df = pd.melt(df, id_vars=columns[:3], value_vars=columns[3:],
-                            var_name='hour', value_name=feature)
-        data_frames.append(melted_df)
-
-    # Connect each of the feature dataframes to make one dataframe
-    all_features_df = data_frames.pop(0)
-    other_features = [x.iloc[:, -1] for x in data_frames]
-    other_features.insert(0, all_features_df)
-    final_df = pd.concat(other_features, axis=1)
-    # fix for data inconsistency
-    final_df['day'] = final_df['day'] - 5
-    return final_df
-
-
+    try:
+        use_long = (_os.path.getmtime(ALL_FEATURES_LONG_PATH) >=
+                    _os.path.getmtime(ALL_FEATURES_PATH))
+    except OSError:
+        use_long = False
+    if use_long:
+        table = np.load(ALL_FEATURES_LONG_PATH, mmap_mode='r')
+    else:
+        # 9 x 1921 x (3 labels + 11 feature time bins)
+        table = long_features_table(np.load(ALL_FEATURES_PATH))
+    return pd.DataFrame(table)
+
+
+@cached(_features_sources)
 def load_mouseday_features(features=None):
     """
     Returns a (1921, 3+11*n) size pandas.DataFrame object corresponding to
@@ -166,10 +243,13 @@ def load_mouseday_features(features=None):
     return data_all
 
 
-def load_intervals(feature):
+@cached(_intervals_sources)
+def load_intervals(feature, strain=None, mouse=None, day=None,
+                   precision="full"):
     """
     Return a pandas.DataFrame object of project interval data
-    for the specified feature.
+    for the specified feature, optionally restricted to a strain,
+    mouse and/or day.
 
     There are 5 columns in the dataframe:
     strain: the strain number of the mouse
@@ -181,50 +261,174 @@ def load_intervals(feature):
     Parameters
     ----------
     feature: {"AS", "F", "IS", "M_AS", "M_IS", "W"}
+    strain: int, optional
+        nonnegative integer indicating the strain number, default all
+    mouse: int, optional
+        nonnegative integer indicating the mouse number, default all
+    day: int, optional
+        nonnegative integer indicating the day number, default all
+    precision: {"full", "compact"}
+        "full" returns int64 keys and float64 times.  "compact" returns
+        uint8 strain and day, uint16 mouse, and float32 start and stop
+        times in seconds since the recording start of each mouse-day
+        (see `load_start_time_end_time`)
 
     Returns
     -------
     intervals : pandas.DataFrame
-        All data of the specified feature as a dataframe
+        All data of the specified feature as a dataframe, sorted by
+        strain, mouse and day
+
+    Notes
+    -----
+    If a packed store has been built with `pack_intervals`, only the rows
+    of the selected mouse-days are read from its memory map.  Otherwise
+    only the files of the selected mouse-days are loaded.
+
+    The round-trip error of the compact precision is reported by
+    `compact_error`.
 
     Examples
     --------
     >>> AS = load_intervals('AS')
     >>> IS = load_intervals('IS')
+    >>> F = load_intervals('F', strain=0, mouse=0, day=0)
     """
     # check input is one of the provided choices
     if feature not in INTERVAL_FEATURES:
         raise ValueError(
             'Input value must be one of {"AS", "F", "IS", "M_AS", "M_IS", "W"}'
         )
-    # get all file names
-    file_names = _os.listdir(_os.path.join(data_dir, "intervals", feature))
-    # check if directory is empty
-    if len(file_names) == 0:
-        raise ValueError('Directory is empty; no file found.')
-    # initialized data frame
-    # use for loop to load every file and concat to overall data frame
+    _check_precision(precision)
+    keys, lengths, endpoints = _read_intervals(feature, strain, mouse, day)
+    keys = np.asarray(keys, dtype=np.int64).reshape(-1, 3)
+    key_rows = np.repeat(keys, lengths, axis=0)
     dt = pd.DataFrame()
-    for item in file_names:
-        strain = int(item.split("strain")[1].split("_mouse")[0])
-        mouse = int(item.split("mouse")[1].split("_day")[0])
-        day = int(item.split("day")[1].split(".npy")[0])
-        path = _os.path.join(data_dir, "intervals", feature, item)
-        sub = np.load(path)
-        dt_sub = pd.DataFrame()
-        dt_sub["strain"] = [strain] * sub.shape[0]
-        dt_sub["mouse"] = [mouse] * sub.shape[0]
-        dt_sub["day"] = [day] * sub.shape[0]
-        dt_sub["start"] = sub[:, 0]
-        dt_sub["stop"] = sub[:, 1]
-        dt = pd.concat([dt, dt_sub])
-    # sort based on strain, mouse and day
-    dt = dt.sort_values(["strain", "mouse", "day"])
-    dt.index = range(dt.shape[0])
+    if precision == "compact":
+        for (i, (column, dtype)) in enumerate(COMPACT_KEY_DTYPES):
+            dt[column] = key_rows[:, i].astype(dtype)
+        offsets = np.repeat(_recording_starts(keys), lengths)
+        dt["start"] = (endpoints[:, 0] - offsets).astype(np.float32)
+        dt["stop"] = (endpoints[:, 1] - offsets).astype(np.float32)
+        return dt
+    dt["strain"] = key_rows[:, 0]
+    dt["mouse"] = key_rows[:, 1]
+    dt["day"] = key_rows[:, 2]
+    dt["start"] = np.array(endpoints[:, 0])
+    dt["stop"] = np.array(endpoints[:, 1])
     return dt
 
 
-def load_movement(strain, mouse, day):
+def _read_intervals(feature, strain, mouse, day):
+    """
+    Return the (strain, mouse, day) keys, number of intervals and
+    endpoints of the selected mouse-days of `feature`, as
+    `load_intervals_view` does.
+    """
+    for value in [strain, mouse, day]:
+        if value is not None and value < 0:
+            raise ValueError("Input values need to be nonnegative")
+    if has_packed_intervals(feature):
+        keys, lengths, endpoints = load_intervals_view(feature, strain,
+                                                       mouse, day)
+    else:
+        # get all file names
+        file_names = _os.listdir(_os.path.join(data_dir, "intervals",
+                                               feature))
+        # check if directory is empty
+        if len(file_names) == 0:
+            raise ValueError('Directory is empty; no file found.')
+        keys = sorted((int(item.split("strain")[1].split("_mouse")[0]),
+                       int(item.split("mouse")[1].split("_day")[0]),
+                       int(item.split("day")[1].split(".npy")[0]))
+                      for item in file_names)
+        keys = np.array(keys).reshape(-1, 3)
+        keys = keys[select_keys(keys, strain, mouse, day)]
+        # load only the selected files and concatenate them once
+        blocks = [np.load(_os.path.join(
+            data_dir, "intervals", feature,
+            "{}_strain{}_mouse{}_day{}.npy".format(feature, *key)))
+            for key in keys]
+        lengths = [sub.shape[0] for sub in blocks]
+        if len(blocks) == 0:
+            endpoints = np.zeros((0, 2))
+        else:
+            endpoints = np.concatenate(blocks)
+    return keys, lengths, endpoints
+
+
+def load_intervals_collection(feature, strain=None, mouse=None, day=None):
+    """
+    Return the intervals of the specified feature as an
+    IntervalsCollection with one member per mouse-day, optionally
+    restricted to a strain, mouse and/or day.
+
+    Parameters
+    ----------
+    feature: {"AS", "F", "IS", "M_AS", "M_IS", "W"}
+    strain: int, optional
+        nonnegative integer indicating the strain number, default all
+    mouse: int, optional
+        nonnegative integer indicating the mouse number, default all
+    day: int, optional
+        nonnegative integer indicating the day number, default all
+
+    Returns
+    -------
+    collection : IntervalsCollection
+        intervals of each mouse-day, keyed by (strain, mouse, day) tuples
+        sorted by strain, mouse and day
+
+    Notes
+    -----
+    With a packed store built by `pack_intervals`, the endpoints of a
+    contiguous selection are a memory map of the store.
+
+    Examples
+    --------
+    >>> AS = load_intervals_collection('AS', strain=0)
+    >>> AS.measure()
+    >>> for (strain, mouse, day), ints in AS.items():
+    ...     print(strain, mouse, day, ints.num())
+    """
+    if feature not in INTERVAL_FEATURES:
+        raise ValueError(
+            'Input value must be one of {"AS", "F", "IS", "M_AS", "M_IS", "W"}'
+        )
+    keys, lengths, endpoints = _read_intervals(feature, strain, mouse, day)
+    keys = np.asarray(keys, dtype=np.int64).reshape(-1, 3)
+    return IntervalsCollection(endpoints,
+                               np.concatenate(([0], np.cumsum(lengths))),
+                               [tuple(key) for key in keys.tolist()])
+
+
+def _check_precision(precision):
+    if precision not in PRECISIONS:
+        raise ValueError('precision must be one of {"full", "compact"}')
+
+
+def _recording_starts(keys):
+    """ Return the recording start times of an (n, 3) array of keys. """
+    catalog = load_catalog()
+    return np.array([catalog.start_time_end_time(*key)[0]
+                     for key in keys.tolist()])
+
+
+def _compact_movement(movement, start_time):
+    """
+    Return a compact copy of a full precision movement frame, with
+    float32 coordinates and float32 times relative to `start_time`.
+    """
+    return pd.DataFrame({"t": (movement["t"].values -
+                               start_time).astype(np.float32),
+                         "x": movement["x"].values.astype(np.float32),
+                         "y": movement["y"].values.astype(np.float32),
+                         "isHB": movement["isHB"].values},
+                        columns=["t", "x", "y", "isHB"])
+
+
+@cached(_movement_sources)
+def load_movement(strain, mouse, day, precision="full"):
     """
     Return a pandas.DataFrame object of project movement data
     for the specified combination of strain, mouse and day.
@@ -243,6 +447,10 @@ def load_movement(strain, mouse, day):
         nonnegative integer indicating the mouse number
     day: int
         nonnegative integer indicating the day number
+    precision: {"full", "compact"}
+        "full" returns float64 columns.  "compact" returns float32 x and
+        y, and float32 t in seconds since the recording start given by
+        `load_start_time_end_time`, halving the memory of the frame
 
     Returns
     -------
@@ -250,10 +458,21 @@ def load_movement(strain, mouse, day):
         CT, CX, CY coordinates and home base status
         of the combination of strain, mouse and day
 
+    Notes
+    -----
+    If a packed store has been built with `pack_movement`, the data is
+    read from its memory map instead of the four per mouse-day files,
+    unless the store does not hold the mouse-day or is older than its
+    files.
+
+    The round-trip error of the compact precision is reported by
+    `compact_error`.
+
     Examples
     --------
     >>> movement = load_movement(0, 0, 0)
     >>> movement = load_movement(1, 2, 1)
+    >>> movement = load_movement(1, 2, 1, precision="compact")
     """
     # check if all inputs are nonnegative integers
     conditions_value = [strain < 0, mouse < 0, day < 0]
@@ -263,6 +482,22 @@ def load_movement(strain, mouse, day):
         raise ValueError("Input values need to be nonnegative")
     if any(conditions_type):
         raise TypeError("Input values need to be integer")
+    _check_precision(precision)
+    movement = _load_movement(strain, mouse, day)
+    if precision == "compact":
+        start_time = load_start_time_end_time(strain, mouse, day)[0]
+        return _compact_movement(movement, start_time)
+    return movement
+
+
+def _load_movement(strain, mouse, day):
+    """ Load the full precision movement frame of a mouse-day. """
+    # serve the mouse-day from the packed store when it holds an up to
+    # date copy of it
+    if _packed_movement((strain, mouse, day)) is not None:
+        CT, CX, CY, HB = load_movement_view(strain, mouse, day)
+        return pd.DataFrame({"t": CT, "x": CX, "y": CY, "isHB": HB},
+                            columns=["t", "x", "y", "isHB"])
     # load all four files of HB, CT, CX and CY data
     NHB_path = "txy_coords/C_idx_HB/C_idx_HB_strain{}_mouse{}_day{}.npy".\
         format(strain, mouse, day)
@@ -289,6 +524,193 @@ def load_movement(strain, mouse, day):
     return dt
 
 
+def _movement_memmaps(strain, mouse, day):
+    """
+    Return memory-mapped (t, x, y, isHB) arrays of a mouse-day, from the
+    packed store when it holds an up to date copy of the mouse-day and
+    otherwise from the `.npy` files.
+    The last element tells whether the isHB array holds the negated home
+    base status, as the C_idx_HB files do.
+    """
+    if _packed_movement((strain, mouse, day)) is not None:
+        return load_movement_view(strain, mouse, day) + (False,)
+    try:
+        return tuple(
+            np.load(_os.path.join(data_dir, "txy_coords", column,
+                                  "{}_strain{}_mouse{}_day{}.npy".format(
+                                      column, strain, mouse, day)),
+                    mmap_mode='r')
+            for column in ["CT", "CX", "CY", "C_idx_HB"]) + (True,)
+    except IOError:
+        raise ValueError("No data exists for strain {}, mouse {}, day {}".
+                         format(strain, mouse, day))
+
+
+def iter_movement_windows(strain, mouse, day, window_seconds, overlap=0):
+    """
+    Generator yielding the movement data of a mouse-day in consecutive
+    time windows, read from a memory map so that peak memory depends on
+    the window length only and not on the length of the recording.
+
+    Windows start at the recording start time and are `window_seconds`
+    long; consecutive windows overlap by `overlap` seconds.  As in
+    `utils.pull_locom_tseries_subset`, a sample is added at each window
+    boundary that has no recorded movement, carrying the position of the
+    last sample registered before it, since a mouse that does not move
+    records nothing.
+
+    Parameters
+    ----------
+    strain: int
+        nonnegative integer indicating the strain number
+    mouse: int
+        nonnegative integer indicating the mouse number
+    day: int
+        nonnegative integer indicating the day number
+    window_seconds: float
+        positive length of the windows in seconds
+    overlap: float
+        nonnegative overlap between windows, smaller than window_seconds
+
+    Returns
+    -------
+    windows : generator of (t, x, y, isHB) tuples of numpy arrays
+        the samples of each window [a, b), a ending with a sample at b
+        when the recording continues after the window
+
+    Examples
+    --------
+    >>> for t, x, y, isHB in iter_movement_windows(0, 0, 0, 3600):
+    ...     print(t[0], len(t))
+    """
+    conditions_value = [strain < 0, mouse < 0, day < 0]
+    conditions_type = [type(strain) != int, type(mouse) != int,
+                       type(day) != int]
+    if any(conditions_value):
+        raise ValueError("Input values need to be nonnegative")
+    if any(conditions_type):
+        raise TypeError("Input values need to be integer")
+    if window_seconds <= 0:
+        raise ValueError("window_seconds should be positive")
+    if overlap < 0 or overlap >= window_seconds:
+        raise ValueError("overlap should be nonnegative and smaller "
+                         "than window_seconds")
+    T, X, Y, HB, negated = _movement_memmaps(strain, mouse, day)
+    if T.shape[0] == 0:
+        return
+    start_time, end_time = load_start_time_end_time(strain, mouse, day)
+    columns = [T, X, Y, HB]
+    stride = window_seconds - overlap
+    k = 0
+    while start_time + k * stride < end_time:
+        a = start_time + k * stride
+        b = a + window_seconds
+        k += 1
+        idx_start = T.searchsorted(a)
+        idx_stop = T.searchsorted(b)
+        window = [np.array(c[idx_start:idx_stop]) for c in columns]
+        if idx_start != 0 and (idx_start == T.shape[0] or
+                               T[idx_start] != a):
+            # position at a is the last one registered before it
+            window = [np.concatenate([[c[idx_start - 1]], w])
+                      for (c, w) in zip(columns, window)]
+            window[0][0] = a
+        if idx_stop != T.shape[0] and (idx_stop != 0 or T[0] == b):
+            # position at b, the last one registered before b unless a
+            # sample falls exactly on it
+            tail = idx_stop if T[idx_stop] == b else idx_stop - 1
+            window = [np.concatenate([w, [c[tail]]])
+                      for (c, w) in zip(columns, window)]
+            window[0][-1] = b
+        if window[0].shape[0] == 0:
+            continue
+        if negated:
+            window[3] = ~window[3]
+        yield tuple(window)
+
+
+def _load_movement_task(key, precision):
+    """
+    Load the movement of `key`, returning the exception instead of
+    raising it so that the consumer of load_movements can re-raise it.
+    """
+    try:
+        return key, load_movement(*key, precision=precision), None
+    except Exception as e:
+        return key, None, e
+
+
+def load_movements(keys, workers=None, ordered=True, max_in_flight=None,
+                   precision="full"):
+    """
+    Generator loading the movement data of many mouse-days concurrently
+    on a pool of threads; reading the files releases the GIL, so cold
+    loads scale with the available cores and disks.
+
+    Parameters
+    ----------
+    keys: iterable of (strain, mouse, day) tuples
+        mouse-days to load, e.g. a DatasetCatalog
+    workers: int, optional
+        number of threads, default the number of CPUs
+    ordered: bool
+        if True, yield results in the order of `keys`, otherwise as
+        soon as they are loaded
+    max_in_flight: int, optional
+        maximum number of mouse-days loaded but not yet consumed, which
+        bounds the memory held by the generator, default 2 * workers
+    precision: {"full", "compact"}
+        precision of the frames, see `load_movement`
+
+    Returns
+    -------
+    movements : generator of ((strain, mouse, day), pandas.DataFrame)
+        each key with its load_movement frame
+
+    Examples
+    --------
+    >>> for key, movement in load_movements(load_catalog(), workers=4):
+    ...     print(key, movement.shape)
+    """
+    if workers is None:
+        workers = _cpu_count()
+    if max_in_flight is None:
+        max_in_flight = 2 * workers
+    if workers < 1 or max_in_flight < 1:
+        raise ValueError("workers and max_in_flight should be positive")
+    _check_precision(precision)
+    pool = _ThreadPool(workers)
+    done = six.moves.queue.Queue()
+    pending = collections.deque()
+    try:
+        for key in keys:
+            key = tuple(key)
+            if ordered:
+                pending.append(pool.apply_async(_load_movement_task,
+                                                (key, precision)))
+            else:
+                pending.append(key)
+                pool.apply_async(_load_movement_task, (key, precision),
+                                 callback=done.put)
+            if len(pending) >= max_in_flight:
+                yield _next_movement(pending, done, ordered)
+        while pending:
+            yield _next_movement(pending, done, ordered)
+    finally:
+        pool.terminate()
+
+
+def _next_movement(pending, done, ordered):
+    if ordered:
+        key, movement, error = pending.popleft().get()
+    else:
+        key, movement, error = done.get()
+        pending.pop()
+    if error is not None:
+        raise error
+    return key, movement
+
+
 def _lookup_intervals(times, intervals):
     """
     Return a boolean array where each element is True
@@ -323,7 +745,8 @@ def _lookup_intervals(times, intervals):
     dtype: bool
     """
     ints = Intervals(intervals[['start', 'stop']])
-    return times.map(ints.contains)
+    return pd.Series(ints.contains_many(np.asarray(times)),
+                     index=times.index)
 
 
 def load_movement_and_intervals(strain, mouse, day,
@@ -379,16 +802,23 @@ def load_movement_and_intervals(strain, mouse, day,
     elif not isinstance(features, collections.Iterable):
         raise ValueError('features must be a string or iterable of strings')
     movements = load_movement(strain, mouse, day)
-    for f in features:
-        intervals = load_intervals(feature=f)
-        mouse_intervals = intervals[(intervals['strain'] == strain) &
-                                    (intervals['mouse'] == mouse) &
-                                    (intervals['day'] == day)]
-        movements[f] = _lookup_intervals(movements['t'], mouse_intervals)
+    features = list(features)
+    if len(features) == 0:
+        return movements
+    # one member per feature, all labelled in a single pass over the times
+    blocks = [load_intervals(feature=f, strain=strain, mouse=mouse,
+                             day=day)[['start', 'stop']].values
+              for f in features]
+    offsets = np.cumsum([0] + [block.shape[0] for block in blocks])
+    intervals = IntervalsCollection(np.vstack(blocks), offsets, features)
+    labels = intervals.contains_many(movements['t'].values)
+    for (i, f) in enumerate(features):
+        movements[f] = labels[i]
 
     return movements
 
 
+@cached(_start_time_end_time_sources)
 def load_start_time_end_time(strain, mouse, day):
     """
     Returns the start and end times recorded
@@ -412,12 +842,63 @@ def load_start_time_end_time(strain, mouse, day):
     times: a tuple of (float, float)
         the start time and end time
     """
-    file_name = 'recordingStartTimeEndTime_strain{}_mouse{}_day{}.npy'.\
-                format(strain, mouse, day)
-    path_to_file = _os.path.join(data_dir, 'txy_coords',
-                                 'recordingStartTimeEndTime',
-                                 file_name)
-    return tuple(np.load(path_to_file))
+    return tuple(np.load(_start_time_end_time_file(strain, mouse, day)))
+
+
+def compact_error(strain, mouse, day):
+    """
+    Return the maximum absolute round-trip error of the compact
+    precision for a mouse-day, i.e. the largest difference between the
+    full precision data and the compact data converted back to float64
+    with the recording start time added back to the times.
+
+    Parameters
+    ----------
+    strain: int
+        nonnegative integer indicating the strain number
+    mouse: int
+        nonnegative integer indicating the mouse number
+    day: int
+        nonnegative integer indicating the day number
+
+    Returns
+    -------
+    errors : pandas.Series
+        maximum errors of the movement columns t, x and y, followed by
+        the maximum error over the start and stop times of each interval
+        feature
+
+    Examples
+    --------
+    >>> errors = compact_error(0, 0, 0)
+    >>> errors["t"] < 0.01
+    True
+    """
+    start_time = load_start_time_end_time(strain, mouse, day)[0]
+    full = load_movement(strain, mouse, day)
+    compact = load_movement(strain, mouse, day, precision="compact")
+    offsets = {"t": start_time, "x": 0, "y": 0}
+    errors = collections.OrderedDict()
+    for column in ["t", "x", "y"]:
+        errors[column] = _max_error(
+            full[column].values,
+            compact[column].values.astype(np.float64) + offsets[column])
+    for feature in INTERVAL_FEATURES:
+        full = load_intervals(feature, strain, mouse, day)
+        compact = load_intervals(feature, strain, mouse, day,
+                                 precision="compact")
+        errors[feature] = max(
+            _max_error(full[column].values,
+                       compact[column].values.astype(np.float64) +
+                       start_time)
+            for column in ["start", "stop"])
+    return pd.Series(errors)
+
+
+def _max_error(expected, actual):
+    if expected.shape[0] == 0:
+        return 0.0
+    return float(np.abs(expected - actual).max())
 
 
 def distances(strain, mouse, day, step=50):
@@ -464,17 +945,89 @@ def distances(strain, mouse, day, step=50):
     """
     movement = load_movement(strain, mouse, day)
     # Compute distance between samples
-    dist = np.sqrt(movement["x"].diff()[1:]**2 + movement["y"].diff()[1:]**2)
-    time = movement['t'][1:] - movement['t'][0]
-    t_final = time[len(time) - 1]
-    # Aggregate distances according to step
-    aggregate = np.zeros(int(t_final / step))
-    j = 1
-    for i in range(len(aggregate)):
-        while time[j] < i * step:
-            aggregate[i] = aggregate[i] + dist[j]
-            j = j + 1
-    return aggregate
+    dist = np.sqrt(np.diff(movement["x"].values)**2 +
+                   np.diff(movement["y"].values)**2)
+    time = movement['t'].values[1:] - movement['t'].values[0]
+    # the second to last sample bounds the number of steps
+    t_final = time[len(time) - 2]
+    return _bin_distances(time, dist, step, int(t_final / step))
+
+
+def _bin_distances(time, dist, step, n_bins):
+    """
+    Sum the distances `dist` covered at the sorted times `time` into
+    `n_bins` bins of width `step`, bin i collecting the samples with
+    (i - 1) * step <= time < i * step; later samples are dropped.
+    """
+    edges = np.arange(n_bins) * step
+    bins = edges.searchsorted(time, side='right')
+    keep = bins < n_bins
+    return np.bincount(bins[keep], weights=dist[keep], minlength=n_bins)
+
+
+def iter_distances_bymouse(strain, mouse, step=50, verbose=False):
+    """
+    Generator yielding 'distances' for each day of recorded data for
+    one particular mouse, in day order.
+
+    Parameters
+    ----------
+    strain: int
+        nonnegative integer indicating the strain number
+    mouse: int
+        nonnegative integer indicating the mouse number
+    step: float
+        positive float defining the time between two observations
+        default corresponds to 1 second
+
+    Returns
+    -------
+    distances : generator of numpy arrays
+
+    Examples
+    --------
+    >>> for dist in iter_distances_bymouse(0, 0, step=1e2):
+    ...     print(dist.sum())
+    """
+    for day in load_catalog().days(strain, mouse):
+        yield distances(strain, mouse, day, step=step)
+        if verbose:
+            print('day %s done.' % (day + 1))
+
+
+def iter_distances_bystrain(strain, step=50, verbose=False):
+    """
+    Generator yielding 'distances' for each day of recorded data of
+    every mouse in one given strain, ordered by mouse then day.
+
+    Parameters
+    ----------
+    strain: int
+        nonnegative integer indicating the strain number
+    step: float
+        positive float defining the time between two observations
+        default corresponds to 1 second
+
+    Returns
+    -------
+    distances : generator of numpy arrays
+
+    Examples
+    --------
+    >>> total = sum(dist.sum() for dist in iter_distances_bystrain(0))
+    """
+    for mouse in load_catalog().mice(strain):
+        for dist in iter_distances_bymouse(strain, mouse, step=step):
+            yield dist
+        if verbose:
+            print('mouse %s done.' % (mouse + 1))
+
+
+def _concatenate(arrays):
+    arrays = list(arrays)
+    if len(arrays) == 0:
+        return np.array([])
+    return np.concatenate(arrays)
 
 
 def distances_bymouse(strain, mouse, step=50, verbose=False):
@@ -506,18 +1059,8 @@ def distances_bymouse(strain, mouse, step=50, verbose=False):
     --------
     >>> dist = distances_bymouse(0, 0, step=1e2)
     """
-    day = 0
-    res = np.array([])
-    while True:
-        try:
-            res = np.append(res, distances(strain, mouse, day,
-                                           step=step))
-            day += 1
-            if verbose:
-                print('day %s done.' % day)
-        except ValueError:
-            break
-    return res
+    return _concatenate(iter_distances_bymouse(strain, mouse, step=step,
+                                               verbose=verbose))
 
 
 def distances_bystrain(strain, step=50, verbose=False):
@@ -547,17 +1090,8 @@ def distances_bystrain(strain, step=50, verbose=False):
     --------
     >>> dist = distances_bystrain(0, step=1e2)
     """
-    mouse = 0
-    res = np.array([])
-    dist = np.array([0])
-    while dist.size > 0:
-        dist = distances_bymouse(strain, mouse,
-                                 step=step)
-        res = np.append(res, dist)
-        mouse += 1
-        if verbose:
-            print('mouse %s done.' % mouse)
-    return res
+    return _concatenate(iter_distances_bystrain(strain, step=step,
+                                                verbose=verbose))
 
 
 def load_time_matrix_dynamics():
@@ -0,0 +1,196 @@
+"""Process-wide cache for the data loaders.
+
+Loaded objects are kept in a least-recently-used cache bounded by a
+memory budget in bytes.  Each entry remembers the modification times of
+the files it was read from and is reloaded when any of them changes.
+Callers always receive a copy, so mutating a returned frame never
+corrupts the cached value.
+"""
+
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+import collections
+import functools
+import os as _os
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+# default budget of the process-wide cache, in bytes
+DEFAULT_MAX_BYTES = 512 * 2 ** 20
+
+CacheInfo = collections.namedtuple(
+    'CacheInfo', ['hits', 'misses', 'max_bytes', 'current_bytes',
+                  'entries'])
+
+
+def _mtime(path):
+    try:
+        return _os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def _nbytes(value):
+    """
+    Return an estimate of the memory used by a loaded object: the bytes
+    of its arrays and frames, or its `nbytes` attribute for other
+    objects holding them.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(np.sum(value.memory_usage(index=True)))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sum(_nbytes(v) for v in value) + sys.getsizeof(value)
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    return sys.getsizeof(value)
+
+
+def _copy(value):
+    if isinstance(value, (pd.DataFrame, np.ndarray)):
+        return value.copy()
+    if isinstance(value, tuple):
+        return tuple(_copy(v) for v in value)
+    return value
+
+
+def _hashable(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_hashable(v) for v in value)
+    return value
+
+
+class LoaderCache(object):
+    """ Least-recently-used cache bounded by a budget in bytes.
+
+    Parameters
+    ----------
+    max_bytes: int
+        memory budget; objects larger than the budget are never cached
+        and a budget of 0 disables caching
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.current_bytes = 0
+        self._entries = collections.OrderedDict()
+        # loaders may be called from several threads (see load_movements)
+        self._lock = threading.Lock()
+
+    def get(self, key, sources, load):
+        """
+        Return a copy of the object cached under `key`, calling `load`
+        to (re)build it when it is missing or when the modification time
+        of one of the `sources` files has changed.
+        """
+        stamp = tuple(_mtime(path) for path in sources)
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None and entry[0] == stamp:
+                self.hits += 1
+                # reinsert as the most recently used entry
+                self._entries[key] = entry
+            else:
+                if entry is not None:
+                    self.current_bytes -= entry[2]
+                entry = None
+                self.misses += 1
+        if entry is not None:
+            return _copy(entry[1])
+        value = load()
+        size = _nbytes(value)
+        if size > self.max_bytes:
+            return value
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[2]
+            self._entries[key] = (stamp, value, size)
+            self.current_bytes += size
+            self._evict()
+        return _copy(value)
+
+    def _evict(self):
+        while self.current_bytes > self.max_bytes:
+            _, (_, _, size) = self._entries.popitem(last=False)
+            self.current_bytes -= size
+
+    def resize(self, max_bytes):
+        """ Change the memory budget, evicting entries if needed. """
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self):
+        """ Drop every entry and reset the hit and miss counters. """
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, self.max_bytes,
+                         self.current_bytes, len(self._entries))
+
+
+loader_cache = LoaderCache()
+
+
+def cached(sources):
+    """
+    Decorator caching the results of a loader in `loader_cache`.
+
+    Parameters
+    ----------
+    sources: callable
+        called with the arguments of the loader, returns the paths of
+        the files whose modification times invalidate the entry
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (func.__name__, _hashable(args),
+                   _hashable(sorted(kwargs.items())))
+            return loader_cache.get(key, sources(*args, **kwargs),
+                                    lambda: func(*args, **kwargs))
+        return wrapper
+    return decorator
+
+
+def set_cache_budget(max_bytes):
+    """
+    Set the memory budget of the loader cache in bytes; 0 disables it.
+
+    Examples
+    --------
+    >>> set_cache_budget(2 * 2 ** 30)
+    """
+    if max_bytes < 0:
+        raise ValueError("max_bytes should be nonnegative")
+    loader_cache.resize(max_bytes)
+
+
+def cache_info():
+    """
+    Return the hits, misses, budget, used bytes and number of entries of
+    the loader cache.
+
+    Examples
+    --------
+    >>> info = cache_info()
+    >>> info.hits, info.misses
+    """
+    return loader_cache.info()
+
+
+def clear_cache():
+    """ Empty the loader cache and reset its counters. """
+    loader_cache.clear()
@@ -0,0 +1,133 @@
+"""Catalog of the mouse-days available in the data directory."""
+
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+import os as _os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from mousestyles import data_dir
+from mousestyles.data.packed import _scan_keys, _packed_movement
+
+
+class DatasetCatalog(object):
+    """ Mouse-days available on disk, found with a single directory scan.
+
+    The catalog lists the valid (strain, mouse, day) keys together with
+    the number of movement samples and the recording start and end
+    times of each mouse-day, so that batch analyses can iterate over
+    the data instead of probing the loaders for errors.
+
+    Parameters
+    ----------
+    path: str, optional
+        data directory to scan, default the package data directory
+
+    Attributes
+    ----------
+    table: pandas.DataFrame
+        one row per mouse-day, sorted by strain, mouse and day, with
+        columns strain, mouse, day, samples, start and end
+
+    Examples
+    --------
+    >>> catalog = DatasetCatalog()
+    >>> len(catalog)
+    137
+    >>> for (strain, mouse, day) in catalog:
+    ...     pass
+    >>> catalog.days(0, 0)
+    [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11]
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            path = data_dir
+        txy_dir = _os.path.join(path, 'txy_coords')
+        keys = _scan_keys(_os.path.join(txy_dir, 'CT'))
+        self._rows = dict((key, i) for (i, key) in enumerate(keys))
+
+        samples = np.zeros(len(keys), dtype=np.int64)
+        times = np.zeros((len(keys), 2))
+        for (i, key) in enumerate(keys):
+            name = 'strain{}_mouse{}_day{}.npy'.format(*key)
+            store = _packed_movement(key) if path == data_dir else None
+            if store is not None:
+                start, stop = store.rows[key]
+                samples[i] = stop - start
+            else:
+                # only the header of the file is read
+                samples[i] = np.load(
+                    _os.path.join(txy_dir, 'CT', 'CT_' + name),
+                    mmap_mode='r').shape[0]
+            times[i] = np.load(_os.path.join(
+                txy_dir, 'recordingStartTimeEndTime',
+                'recordingStartTimeEndTime_' + name))
+
+        keys = np.array(keys, dtype=np.int64).reshape(-1, 3)
+        self.table = pd.DataFrame({'strain': keys[:, 0],
+                                   'mouse': keys[:, 1],
+                                   'day': keys[:, 2],
+                                   'samples': samples,
+                                   'start': times[:, 0],
+                                   'end': times[:, 1]},
+                                  columns=['strain', 'mouse', 'day',
+                                           'samples', 'start', 'end'])
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __contains__(self, key):
+        return tuple(key) in self._rows
+
+    @property
+    def nbytes(self):
+        """ Estimate of the memory used by the catalog, in bytes. """
+        return (int(self.table.memory_usage(index=True).sum()) +
+                sys.getsizeof(self._rows) +
+                sum(sys.getsizeof(key) for key in self._rows))
+
+    def keys(self, strain=None, mouse=None):
+        """
+        Return the sorted list of (strain, mouse, day) keys, optionally
+        restricted to a strain and mouse.
+        """
+        table = self.table
+        mask = np.ones(len(table), dtype=bool)
+        if strain is not None:
+            mask &= table['strain'].values == strain
+        if mouse is not None:
+            mask &= table['mouse'].values == mouse
+        selected = table[mask]
+        return list(zip(selected['strain'].tolist(),
+                        selected['mouse'].tolist(),
+                        selected['day'].tolist()))
+
+    def strains(self):
+        """ Return the sorted list of strain numbers. """
+        return sorted(set(self.table['strain'].tolist()))
+
+    def mice(self, strain):
+        """ Return the sorted list of mouse numbers of a strain. """
+        table = self.table
+        return sorted(set(table['mouse'][table['strain'] == strain].tolist()))
+
+    def days(self, strain, mouse):
+        """ Return the sorted list of day numbers of a mouse. """
+        return [day for (_, _, day) in self.keys(strain, mouse)]
+
+    def samples(self, strain, mouse, day):
+        """ Return the number of movement samples of a mouse-day. """
+        return int(self.table['samples'].values[
+            self._rows[(strain, mouse, day)]])
+
+    def start_time_end_time(self, strain, mouse, day):
+        """ Return the recording (start, end) times of a mouse-day. """
+        i = self._rows[(strain, mouse, day)]
+        return (self.table['start'].values[i], self.table['end'].values[i])
@@ -0,0 +1,484 @@
+"""Packed, memory-mapped storage for the per mouse-day data files.
+
+The raw data ships as one small ``.npy`` file per mouse-day and per
+column.  The functions in this module concatenate those files once into
+a single columnar binary file plus an offset index keyed by
+(strain, mouse, day).  Any mouse-day can then be served as zero-copy
+views into a memory map instead of opening and parsing several files.
+
+The stores are written to a user cache directory, `PACKED_DIR`, rather
+than into the installed package.
+"""
+
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+import os as _os
+import re as _re
+import tempfile as _tempfile
+
+import numpy as np
+
+from mousestyles import data_dir
+
+
+def _user_cache_dir():
+    """ Return the cache directory of the user, as in XDG_CACHE_HOME. """
+    cache = _os.environ.get('XDG_CACHE_HOME')
+    if not cache:
+        cache = _os.path.join(_os.path.expanduser('~'), '.cache')
+    return _os.path.join(cache, 'mousestyles')
+
+
+PACKED_DIR = _os.path.join(_user_cache_dir(), 'packed')
+
+# atomic on POSIX; os.replace is missing from Python 2
+_replace = getattr(_os, 'replace', _os.rename)
+
+# (column name, txy_coords sub-directory, stored dtype)
+MOVEMENT_COLUMNS = [('t', 'CT', np.float64),
+                    ('x', 'CX', np.float64),
+                    ('y', 'CY', np.float64),
+                    ('isHB', 'C_idx_HB', np.bool_)]
+
+INDEX_DTYPE = np.dtype([('strain', np.int64), ('mouse', np.int64),
+                        ('day', np.int64), ('start', np.int64),
+                        ('stop', np.int64)])
+
+ALL_FEATURES_PATH = _os.path.join(data_dir,
+                                  'all_features_mousedays_11bins.npy')
+ALL_FEATURES_LONG_PATH = _os.path.join(
+    data_dir, 'all_features_mousedays_11bins_long.npy')
+
+# 9 features of all_features_mousedays_11bins.npy, in file order
+FEATURES = ['ASProbability', 'ASNumbers', 'ASDurations', 'Food', 'Water',
+            'Distance', 'ASFoodIntensity', 'ASWaterIntensity',
+            'MoveASIntensity']
+
+LONG_FEATURES_DTYPE = np.dtype(
+    [('strain', np.uint8), ('mouse', np.uint16), ('day', np.uint8),
+     ('hour', np.uint8)] + [(f, np.float64) for f in FEATURES])
+
+_KEY_PATTERN = _re.compile(r'strain(\d+)_mouse(\d+)_day(\d+)\.npy$')
+
+# path of an index file -> (modification time, opened store)
+_open_stores = {}
+
+
+def _parse_key(file_name):
+    """
+    Return the (strain, mouse, day) key encoded in a data file name,
+    or None if the name does not follow the naming convention.
+    """
+    match = _KEY_PATTERN.search(file_name)
+    if match is None:
+        return None
+    return tuple(int(g) for g in match.groups())
+
+
+def _scan_keys(directory):
+    """
+    Return the sorted list of (strain, mouse, day) keys of the data
+    files found in `directory`.
+    """
+    keys = [_parse_key(f) for f in _os.listdir(directory)]
+    return sorted(k for k in keys if k is not None)
+
+
+def _movement_file(column_dir, key):
+    name = '{}_strain{}_mouse{}_day{}.npy'.format(column_dir, *key)
+    return _os.path.join(data_dir, 'txy_coords', column_dir, name)
+
+
+def _interval_file(feature, key):
+    name = '{}_strain{}_mouse{}_day{}.npy'.format(feature, *key)
+    return _os.path.join(data_dir, 'intervals', feature, name)
+
+
+def _store_paths(path, name):
+    """ Return the (data, index) file names of a packed store. """
+    if path is None:
+        path = PACKED_DIR
+    return (_os.path.join(path, name + '.bin'),
+            _os.path.join(path, name + '_index.npy'))
+
+
+def _build_index(keys, lengths):
+    """ Return the offset index of consecutive blocks of `lengths` rows. """
+    index = np.zeros(len(keys), dtype=INDEX_DTYPE)
+    stops = np.cumsum(np.asarray(lengths, dtype=np.int64))
+    if len(keys) > 0:
+        keys = np.asarray(keys, dtype=np.int64)
+        index['strain'] = keys[:, 0]
+        index['mouse'] = keys[:, 1]
+        index['day'] = keys[:, 2]
+    index['stop'] = stops
+    index['start'] = stops - lengths
+    return index
+
+
+def pack_movement(path=None, keys=None):
+    """
+    Concatenate the CT, CX, CY and C_idx_HB files of every mouse-day into
+    one columnar binary file `movement.bin` with an offset index
+    `movement_index.npy`, both written to `path`.
+
+    The data file holds the four columns back to back (t, x, y as
+    float64 and isHB as bool), each column being the concatenation of
+    all mouse-days in the order of the index.
+
+    Parameters
+    ----------
+    path: str, optional
+        directory receiving the packed store, default `PACKED_DIR`, a
+        directory of the user cache
+    keys: list of (strain, mouse, day) tuples, optional
+        mouse-days to pack, default every mouse-day found on disk;
+        the other mouse-days are still read from their `.npy` files
+
+    Returns
+    -------
+    index : numpy.ndarray
+        structured array with fields strain, mouse, day, start and stop
+        giving the rows of each mouse-day in the packed columns
+
+    Examples
+    --------
+    >>> index = pack_movement()
+    >>> t, x, y, isHB = load_movement_view(0, 0, 0)
+    """
+    if keys is None:
+        keys = _scan_keys(_os.path.join(data_dir, 'txy_coords', 'CT'))
+    keys = sorted(tuple(int(v) for v in key) for key in keys)
+
+    def write(f):
+        lengths = []
+        for (column, column_dir, dtype) in MOVEMENT_COLUMNS:
+            for key in keys:
+                values = np.load(_movement_file(column_dir, key))
+                if column == 'isHB':
+                    # C_idx_HB flags the samples outside the home base
+                    values = ~values
+                if column == 't':
+                    lengths.append(values.shape[0])
+                f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+        return _build_index(keys, lengths)
+
+    return _write_store(path, 'movement', write)
+
+
+def pack_intervals(path=None, features=None):
+    """
+    Concatenate the interval files of every mouse-day into one packed
+    (M x 2) endpoint array per feature, stored as `intervals_<feature>.bin`
+    with an offset index `intervals_<feature>_index.npy` in `path`.
+
+    Parameters
+    ----------
+    path: str, optional
+        directory receiving the packed stores, default `PACKED_DIR`, a
+        directory of the user cache
+    features: list of str, optional
+        features to pack, default every feature found on disk
+
+    Returns
+    -------
+    indices : dict
+        the offset index written for each feature
+
+    Examples
+    --------
+    >>> indices = pack_intervals(features=['AS', 'F'])
+    """
+    if features is None:
+        features = sorted(_os.listdir(_os.path.join(data_dir, 'intervals')))
+    indices = {}
+    for feature in features:
+        keys = _scan_keys(_os.path.join(data_dir, 'intervals', feature))
+
+        def write(f, feature=feature, keys=keys):
+            lengths = []
+            for key in keys:
+                values = np.load(_interval_file(feature, key))
+                values = np.ascontiguousarray(values, dtype=np.float64)
+                values = values.reshape(-1, 2)
+                lengths.append(values.shape[0])
+                f.write(values.tobytes())
+            return _build_index(keys, lengths)
+
+        indices[feature] = _write_store(path, 'intervals_' + feature, write)
+    return indices
+
+
+def _write_store(path, name, write):
+    """
+    Write the packed store `name` to `path`.  `write` is called with the
+    open data file and returns the offset index.  The data and index are
+    written to temporary files first and then moved over the store, the
+    data file first and the index last, so that the memory maps of the
+    previous store held by readers stay valid and the loaders only pick
+    the new store up once it is complete.
+    """
+    data_file, index_file = _store_paths(path, name)
+    directory = _os.path.dirname(data_file)
+    if not _os.path.isdir(directory):
+        _os.makedirs(directory)
+    temporary = []
+    try:
+        fd, data_tmp = _tempfile.mkstemp(dir=directory, prefix=name,
+                                         suffix='.tmp')
+        temporary.append(data_tmp)
+        with _os.fdopen(fd, 'wb') as f:
+            index = write(f)
+        fd, index_tmp = _tempfile.mkstemp(dir=directory, prefix=name,
+                                          suffix='.tmp')
+        temporary.append(index_tmp)
+        with _os.fdopen(fd, 'wb') as f:
+            np.save(f, index)
+        _open_stores.pop(index_file, None)
+        _replace(data_tmp, data_file)
+        _replace(index_tmp, index_file)
+        _open_stores.pop(index_file, None)
+    finally:
+        for tmp in temporary:
+            if _os.path.exists(tmp):
+                _os.remove(tmp)
+    return index
+
+
+def long_features_table(all_features):
+    """
+    Reshape the (9 x mouse-days x (3 labels + 11 bins)) feature array
+    into a structured array with one row per mouse-day and 2-hour bin,
+    ordered by bin then mouse-day, with fields strain, mouse, day, hour
+    and the 9 features.
+    """
+    n_features, n_rows, n_columns = all_features.shape
+    hours = np.arange(0, 2 * (n_columns - 3), 2)
+    labels = all_features[0, :, :3]
+    # (bins x mouse-days x features) so that rows are ordered by bin
+    values = all_features[:, :, 3:].transpose(2, 1, 0).reshape(
+        -1, n_features)
+    table = np.empty(values.shape[0], dtype=LONG_FEATURES_DTYPE)
+    table['strain'] = np.tile(labels[:, 0], len(hours))
+    table['mouse'] = np.tile(labels[:, 1], len(hours))
+    # fix for data inconsistency
+    table['day'] = np.tile(labels[:, 2] - 5, len(hours))
+    table['hour'] = np.repeat(hours, n_rows)
+    for (i, feature) in enumerate(FEATURES):
+        table[feature] = values[:, i]
+    return table
+
+
+def pack_all_features(path=None):
+    """
+    Save the long table of `long_features_table` as a memory-mappable
+    `.npy` file, by default alongside all_features_mousedays_11bins.npy,
+    where `load_all_features` picks it up.
+
+    Parameters
+    ----------
+    path: str, optional
+        file name, default `ALL_FEATURES_LONG_PATH`
+
+    Returns
+    -------
+    table : numpy.ndarray
+        the structured array written
+
+    Examples
+    --------
+    >>> table = pack_all_features()
+    """
+    if path is None:
+        path = ALL_FEATURES_LONG_PATH
+    table = long_features_table(np.load(ALL_FEATURES_PATH))
+    np.save(path, table)
+    return table
+
+
+class _PackedStore(object):
+    """
+    Read-only view of a packed store: one memory map per column and a
+    dictionary from (strain, mouse, day) to the row range of that key.
+    """
+
+    def __init__(self, data_file, index_file, columns):
+        self.index = np.load(index_file)
+        n = int(self.index['stop'][-1]) if len(self.index) > 0 else 0
+        self.columns = {}
+        offset = 0
+        for (column, dtype, shape) in columns:
+            shape = (n,) + tuple(shape)
+            if n == 0:
+                self.columns[column] = np.zeros(shape, dtype=dtype)
+            else:
+                self.columns[column] = np.memmap(
+                    data_file, dtype=dtype, mode='r', offset=offset,
+                    shape=shape)
+            offset += int(np.prod(shape)) * np.dtype(dtype).itemsize
+        self.rows = dict(
+            ((int(r['strain']), int(r['mouse']), int(r['day'])),
+             (int(r['start']), int(r['stop'])))
+            for r in self.index)
+
+    def view(self, column, key):
+        start, stop = self.rows[key]
+        return self.columns[column][start:stop]
+
+
+def _open_store(path, name, columns):
+    """
+    Return the opened packed store `name` found in `path`, or None if no
+    store has been packed there.  Stores are opened once per process and
+    reopened when their index file changes.
+    """
+    data_file, index_file = _store_paths(path, name)
+    try:
+        mtime = _os.path.getmtime(index_file)
+    except OSError:
+        return None
+    cached = _open_stores.get(index_file)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    store = _PackedStore(data_file, index_file, columns)
+    store.mtime = mtime
+    _open_stores[index_file] = (mtime, store)
+    return store
+
+
+def _open_movement_store(path=None):
+    return _open_store(path, 'movement',
+                       [(c, dtype, ()) for (c, _, dtype) in MOVEMENT_COLUMNS])
+
+
+def has_packed_movement(path=None):
+    """ Return True if a packed movement store exists in `path`. """
+    return _open_movement_store(path) is not None
+
+
+def _packed_movement(key, path=None):
+    """
+    Return the packed movement store of `path` if it holds `key` and is
+    not older than the `.npy` files of `key`, otherwise None, in which
+    case the mouse-day is read from its `.npy` files.
+    """
+    store = _open_movement_store(path)
+    if store is None or key not in store.rows:
+        return None
+    for (_, column_dir, _) in MOVEMENT_COLUMNS:
+        try:
+            if _os.path.getmtime(_movement_file(column_dir, key)) > \
+                    store.mtime:
+                return None
+        except OSError:
+            pass
+    return store
+
+
+def load_movement_view(strain, mouse, day, path=None):
+    """
+    Return zero-copy views of the movement data of a mouse-day
+    from the packed store created by `pack_movement`.
+
+    Parameters
+    ----------
+    strain: int
+        nonnegative integer indicating the strain number
+    mouse: int
+        nonnegative integer indicating the mouse number
+    day: int
+        nonnegative integer indicating the day number
+    path: str, optional
+        directory of the packed store, default `PACKED_DIR`
+
+    Returns
+    -------
+    t, x, y, isHB : tuple of numpy.ndarray
+        read-only views of the time, x and y coordinates and home base
+        status of the mouse-day
+
+    Examples
+    --------
+    >>> t, x, y, isHB = load_movement_view(0, 0, 0)
+    """
+    store = _open_movement_store(path)
+    if store is None:
+        raise ValueError("No packed movement store found; "
+                         "run pack_movement() first")
+    key = (strain, mouse, day)
+    if key not in store.rows:
+        raise ValueError("No data exists for strain {}, mouse {}, day {}".
+                         format(strain, mouse, day))
+    return tuple(store.view(column, key)
+                 for (column, _, _) in MOVEMENT_COLUMNS)
+
+
+def _open_intervals_store(feature, path=None):
+    return _open_store(path, 'intervals_' + feature,
+                       [('intervals', np.float64, (2,))])
+
+
+def has_packed_intervals(feature, path=None):
+    """ Return True if a packed interval store of `feature` exists. """
+    return _open_intervals_store(feature, path) is not None
+
+
+def select_keys(keys, strain=None, mouse=None, day=None):
+    """
+    Return a boolean mask of the rows of the (n x 3) array of
+    (strain, mouse, day) `keys` matching the given values; a value of
+    None matches everything.
+    """
+    keys = np.asarray(keys).reshape(-1, 3)
+    mask = np.ones(keys.shape[0], dtype=bool)
+    for (column, value) in enumerate([strain, mouse, day]):
+        if value is not None:
+            mask &= keys[:, column] == value
+    return mask
+
+
+def load_intervals_view(feature, strain=None, mouse=None, day=None,
+                        path=None):
+    """
+    Return the keys and endpoints of the intervals of `feature` matching
+    the given strain, mouse and day from the packed store created by
+    `pack_intervals`.  Only the rows of the selected mouse-days are read.
+
+    Parameters
+    ----------
+    feature: str
+        one of the packed interval features
+    strain, mouse, day: int, optional
+        values to select on; None selects every value
+    path: str, optional
+        directory of the packed store, default `PACKED_DIR`
+
+    Returns
+    -------
+    keys : numpy.ndarray
+        (k x 3) array of the selected (strain, mouse, day) keys
+    lengths : numpy.ndarray
+        number of intervals of each selected key
+    endpoints : numpy.ndarray
+        (M x 2) array of the start and stop times of the selected keys,
+        a zero-copy view when the selection is a contiguous range
+    """
+    store = _open_intervals_store(feature, path)
+    if store is None:
+        raise ValueError("No packed interval store found for {}; "
+                         "run pack_intervals() first".format(feature))
+    index = store.index
+    keys = np.column_stack([index['strain'], index['mouse'], index['day']])
+    selected = np.flatnonzero(select_keys(keys, strain, mouse, day))
+    starts = index['start'][selected]
+    stops = index['stop'][selected]
+    column = store.columns['intervals']
+    if len(selected) == 0:
+        endpoints = np.zeros((0, 2))
+    elif np.all(starts[1:] == stops[:-1]):
+        endpoints = column[starts[0]:stops[-1]]
+    else:
+        endpoints = np.concatenate([column[a:b]
+                                    for (a, b) in zip(starts, stops)])
+    return keys[selected], stops - starts, endpoints
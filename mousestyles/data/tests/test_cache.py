@@ -0,0 +1,130 @@
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import mousestyles.data as data
+from mousestyles.data.cache import LoaderCache
+
+
+def test_loader_cache_lru():
+    cache = LoaderCache(max_bytes=3000)
+    calls = []
+
+    def load(n):
+        calls.append(n)
+        return np.zeros(125)  # 1000 bytes
+
+    for n in [0, 1, 2, 0, 3]:
+        cache.get(n, [], lambda: load(n))
+    # 1 was the least recently used entry when 3 was added
+    assert calls == [0, 1, 2, 3]
+    assert cache.info().entries == 3
+    assert cache.info().current_bytes == 3000
+    cache.get(1, [], lambda: load(1))
+    assert calls == [0, 1, 2, 3, 1]
+    assert cache.hits == 1
+    assert cache.misses == 5
+
+
+def test_loader_cache_copy_and_budget():
+    cache = LoaderCache(max_bytes=1000)
+    value = cache.get('a', [], lambda: pd.DataFrame({'x': [1, 2]}))
+    value['x'] = 0
+    assert list(cache.get('a', [], lambda: None)['x']) == [1, 2]
+    # objects above the budget are returned but not kept
+    cache.get('b', [], lambda: np.zeros(1000))
+    assert cache.info().entries == 1
+    cache.resize(0)
+    assert cache.info().entries == 0
+
+
+def test_loader_cache_nbytes():
+    cache = LoaderCache(max_bytes=5000)
+    # arrays held in tuples and objects with nbytes count in the budget
+    cache.get('a', [], lambda: (1, np.zeros(1000), 0.5))
+    assert cache.info().entries == 0
+    catalog = data.load_catalog()
+    assert catalog.nbytes > catalog.table.memory_usage().sum()
+    cache.resize(catalog.nbytes - 1)
+    cache.get('b', [], lambda: catalog)
+    assert cache.info().entries == 0
+
+
+def test_loader_cache_mtime(tmpdir):
+    path = str(tmpdir.join('x.npy'))
+    np.save(path, np.arange(3))
+    cache = LoaderCache()
+    assert cache.get('x', [path], lambda: np.load(path))[-1] == 2
+    np.save(path, np.arange(5))
+    os.utime(path, (0, 0))
+    assert cache.get('x', [path], lambda: np.load(path))[-1] == 4
+    assert cache.misses == 2
+
+
+def test_cached_loaders():
+    data.clear_cache()
+    first = data.load_all_features()
+    first['Food'] = 0
+    second = data.load_all_features()
+    assert data.cache_info().hits == 1
+    assert data.cache_info().misses == 1
+    assert second['Food'].sum() > 0
+    data.load_movement(0, 0, 0)
+    data.load_movement(0, 0, day=0)
+    data.load_movement(0, 0, 0)
+    assert data.cache_info().hits == 2
+    with pytest.raises(ValueError):
+        data.set_cache_budget(-1)
+    data.clear_cache()
+    assert data.cache_info().entries == 0
+
+
+def test_cached_intervals_rewritten(tmpdir, monkeypatch):
+    directory = tmpdir.mkdir('intervals').mkdir('AS')
+    for day in [0, 1]:
+        np.save(str(directory.join('AS_strain0_mouse0_day{}.npy'.format(
+            day))), np.array([[0., 1.], [2., 3.]]))
+    monkeypatch.setattr(data, 'data_dir', str(tmpdir))
+    monkeypatch.setattr(data.packed, 'data_dir', str(tmpdir))
+    data.clear_cache()
+    try:
+        assert data.load_intervals('AS', day=0)['stop'].max() == 3
+        # rewriting a file in place leaves the directory time unchanged
+        path = str(directory.join('AS_strain0_mouse0_day0.npy'))
+        directory_time = os.path.getmtime(str(directory))
+        np.save(path, np.array([[0., 5.]]))
+        os.utime(path, (0, 0))
+        os.utime(str(directory), (directory_time, directory_time))
+        assert data.load_intervals('AS', day=0)['stop'].max() == 5
+        assert data.cache_info().misses == 2
+    finally:
+        data.clear_cache()
+
+
+def test_cached_catalog_rewritten(tmpdir, monkeypatch):
+    txy = tmpdir.mkdir('txy_coords')
+    name = 'strain0_mouse0_day0.npy'
+    np.save(str(txy.mkdir('CT').join('CT_' + name)), np.arange(3.))
+    times = txy.mkdir('recordingStartTimeEndTime')
+    path = str(times.join('recordingStartTimeEndTime_' + name))
+    np.save(path, np.array([1., 2.]))
+    for module in [data, data.packed, data.catalog]:
+        monkeypatch.setattr(module, 'data_dir', str(tmpdir))
+    data.clear_cache()
+    try:
+        assert data.load_catalog().start_time_end_time(0, 0, 0) == (1, 2)
+        assert data.load_start_time_end_time(0, 0, 0) == (1, 2)
+        # rewriting a file in place leaves the directory time unchanged
+        directory_time = os.path.getmtime(str(times))
+        np.save(path, np.array([3., 4.]))
+        os.utime(path, (0, 0))
+        os.utime(str(times), (directory_time, directory_time))
+        assert data.load_catalog().start_time_end_time(0, 0, 0) == (3, 4)
+        assert data.load_start_time_end_time(0, 0, 0) == (3, 4)
+    finally:
+        data.clear_cache()
@@ -0,0 +1,30 @@
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+import numpy as np
+
+import mousestyles.data as data
+
+
+def test_catalog_keys():
+    catalog = data.load_catalog()
+    assert len(catalog) == 137
+    assert catalog.strains() == [0, 1, 2]
+    assert catalog.mice(0) == [0, 1, 2, 3]
+    assert catalog.days(0, 0) == list(range(12))
+    assert (0, 0, 0) in catalog
+    assert (1000, 0, 0) not in catalog
+    assert list(catalog)[0] == (0, 0, 0)
+    assert catalog.keys(strain=1, mouse=2) == [(1, 2, d)
+                                               for d in catalog.days(1, 2)]
+
+
+def test_catalog_metadata():
+    catalog = data.load_catalog()
+    assert catalog.samples(0, 0, 0) == 39181
+    assert catalog.table.shape == (137, 6)
+    start, end = catalog.start_time_end_time(0, 0, 0)
+    assert np.isclose(start, 49529.76)
+    assert end > start
+    assert np.all(catalog.table['end'] > catalog.table['start'])
+    assert data.load_start_time_end_time(0, 0, 0) == (start, end)
@@ -4,9 +4,12 @@
 from __future__ import (absolute_import, division,
                         print_function, unicode_literals)
 
+import os as _os
+
 import pytest
 
 import mousestyles.data as data
+import mousestyles.data.packed as packed
 import numpy as np
 import pandas as pd
 
@@ -17,6 +20,21 @@ def test_all_features_loader():
     assert all_features.shape == (21131, 13)
 
 
+def test_all_features_long_table(tmpdir, monkeypatch):
+    all_features = data.load_all_features()
+    assert all_features['strain'].dtype == np.uint8
+    assert all_features['mouse'].dtype == np.uint16
+    assert list(all_features['hour'][:2]) == [0, 0]
+    assert all_features['hour'].iloc[-1] == 20
+    assert all_features['day'].min() == 0
+    # the long table saved next to the raw array is used when present
+    path = str(tmpdir.join('long.npy'))
+    table = data.pack_all_features(path)
+    assert table.shape == (21131,)
+    monkeypatch.setattr(data, 'ALL_FEATURES_LONG_PATH', path)
+    assert data.load_all_features().equals(all_features)
+
+
 def test_mouseday_features_loader():
     # Checking load_mouseday_features returns a data frame of
     # the correct dimension
@@ -35,6 +53,48 @@ def test_intervals_loader():
     assert AS.shape == (1343, 5)
 
 
+def test_intervals_loader_selection():
+    # Checking a single mouse-day query returns only its own rows
+    AS = data.load_intervals('AS')
+    sub = data.load_intervals('AS', strain=0, mouse=0, day=0)
+    expected = AS[(AS['strain'] == 0) & (AS['mouse'] == 0) & (AS['day'] == 0)]
+    assert sub.shape == (10, 5)
+    assert np.array_equal(sub.values, expected.values)
+    assert data.load_intervals('AS', strain=1000).shape == (0, 5)
+    with pytest.raises(ValueError) as excinfo:
+        data.load_intervals('AS', strain=-1)
+    assert excinfo.value.args[0] == "Input values need to be nonnegative"
+
+
+def test_intervals_collection_loader():
+    AS = data.load_intervals_collection('AS', strain=0)
+    assert len(AS) == 48
+    assert AS.keys[0] == (0, 0, 0)
+    assert AS.num().sum() == data.load_intervals('AS', strain=0).shape[0]
+    sub = data.load_intervals('AS', strain=0, mouse=0, day=0)
+    assert np.array_equal(AS[0].intervals, sub[['start', 'stop']].values)
+    assert np.allclose(AS.measure()[0], (sub['stop'] - sub['start']).sum())
+    with pytest.raises(ValueError):
+        data.load_intervals_collection('AB')
+
+
+def test_pack_intervals(tmpdir):
+    path = str(tmpdir)
+    index = data.pack_intervals(path=path, features=['AS'])['AS']
+    assert index['stop'][-1] == 1343
+    keys, lengths, endpoints = data.load_intervals_view('AS', path=path)
+    assert keys.shape == (137, 3)
+    assert endpoints.shape == (1343, 2)
+    keys, lengths, endpoints = data.load_intervals_view(
+        'AS', strain=0, mouse=0, day=0, path=path)
+    sub = data.load_intervals('AS', strain=0, mouse=0, day=0)
+    assert np.array_equal(endpoints, sub[['start', 'stop']].values)
+    keys, lengths, endpoints = data.load_intervals_view('AS', day=3,
+                                                        path=path)
+    assert np.all(keys[:, 2] == 3)
+    assert lengths.sum() == endpoints.shape[0]
+
+
 def test_movement_loader():
     # Checking load_movement returns a data frame of the correct dimension
     movement = data.load_movement(0, 0, 0)
@@ -81,6 +141,73 @@ def test_mouseday_load_input():
     assert excinfo.value.args[0] == expected2
 
 
+def test_load_movements():
+    keys = [(0, 0, 0), (1, 1, 1), (0, 0, 1)]
+    loaded = list(data.load_movements(keys, workers=2, max_in_flight=1))
+    assert [key for (key, _) in loaded] == keys
+    assert loaded[1][1].equals(data.load_movement(1, 1, 1))
+    loaded = data.load_movements(keys, workers=2, ordered=False)
+    assert sorted(key for (key, _) in loaded) == sorted(keys)
+    with pytest.raises(ValueError) as excinfo:
+        list(data.load_movements([(0, 0, 0), (1000, 0, 0)], workers=2))
+    expected = "No data exists for strain 1000, mouse 0, day 0"
+    assert excinfo.value.args[0] == expected
+    with pytest.raises(ValueError):
+        list(data.load_movements(keys, workers=0))
+
+
+def test_compact_precision():
+    movement = data.load_movement(0, 0, 1, precision="compact")
+    assert movement.dtypes.tolist() == [np.float32] * 3 + [bool]
+    start = data.load_start_time_end_time(0, 0, 1)[0]
+    assert movement["t"][0] == np.float32(
+        data.load_movement(0, 0, 1)["t"][0] - start)
+    intervals = data.load_intervals("AS", strain=1, precision="compact")
+    assert intervals.dtypes.tolist() == [np.uint8, np.uint16, np.uint8,
+                                         np.float32, np.float32]
+    assert intervals.shape == data.load_intervals("AS", strain=1).shape
+    _, movement = next(data.load_movements([(0, 0, 1)],
+                                           precision="compact"))
+    assert movement["x"].dtype == np.float32
+    errors = data.compact_error(0, 0, 1)
+    assert list(errors.index) == ["t", "x", "y"] + data.INTERVAL_FEATURES
+    assert errors.max() < 0.01
+    with pytest.raises(ValueError):
+        data.load_movement(0, 0, 1, precision="half")
+    with pytest.raises(ValueError):
+        data.load_intervals("AS", precision="half")
+
+
+def test_iter_movement_windows():
+    movement = data.load_movement(0, 0, 0)
+    start, end = data.load_start_time_end_time(0, 0, 0)
+    windows = list(data.iter_movement_windows(0, 0, 0, 3600, overlap=600))
+    assert len(windows) == int(np.ceil((end - start) / 3000))
+    t, x, y, isHB = windows[1]
+    assert t[0] == start + 3000
+    assert t[-1] == start + 6600
+    assert np.all(np.diff(t) >= 0)
+    assert isHB.dtype == bool
+    inside = (movement['t'] >= t[0]) & (movement['t'] < t[-1])
+    assert np.array_equal(x[1:-1], movement['x'][inside])
+    # boundary samples repeat the last registered position
+    before = movement[movement['t'] < t[0]].iloc[-1]
+    assert x[0] == before['x'] and isHB[0] == before['isHB']
+    assert windows[-1][0][-1] == movement['t'].values[-1]
+
+
+def test_iter_movement_windows_input():
+    with pytest.raises(ValueError) as excinfo:
+        next(data.iter_movement_windows(0, 0, 0, 0))
+    assert excinfo.value.args[0] == "window_seconds should be positive"
+    with pytest.raises(ValueError) as excinfo:
+        next(data.iter_movement_windows(0, 0, 0, 10, overlap=10))
+    expected = "overlap should be nonnegative and smaller than window_seconds"
+    assert excinfo.value.args[0] == expected
+    with pytest.raises(ValueError):
+        next(data.iter_movement_windows(1000, 0, 0, 10))
+
+
 def test_lookup_intervals():
     t = pd.Series([1.5, 2.5, 3.5])
     ints = pd.DataFrame({'start': [1, 2], 'stop': [1.99, 2.99]})
@@ -140,6 +267,24 @@ def test_array_bystrain():
     assert type(data.distances_bystrain(1)) is np.ndarray
 
 
+def test_bin_distances():
+    time = np.array([0., 0.5, 1., 2.5, 3., 4.])
+    dist = np.ones(6)
+    assert np.array_equal(data._bin_distances(time, dist, 1, 4),
+                          [0, 2, 1, 1])
+
+
+def test_iter_distances():
+    days = list(data.iter_distances_bymouse(0, 0, step=1e3))
+    assert len(days) == 12
+    assert np.array_equal(np.concatenate(days),
+                          data.distances_bymouse(0, 0, step=1e3))
+    assert len(list(data.iter_distances_bymouse(0, 1000))) == 0
+    assert data.distances_bymouse(0, 1000).shape == (0,)
+    n_days = sum(1 for _ in data.iter_distances_bystrain(1, step=1e3))
+    assert n_days == len(data.load_catalog().keys(strain=1))
+
+
 def max_speed():
     # Max speed of a mouse should be less than 40 km/h
     assert max(data.distances(0, 0, 0, step=50) * 3.6 / 100) < 40
@@ -161,3 +306,65 @@ def test_load_time_matrix_dynamics():
     assert time_matrix_dynamics.shape == (137, 88287)
     # Check one specific elemet of the matrix
     assert time_matrix_dynamics.iloc[1, 2] == 1.0
+
+
+def test_pack_movement(tmpdir):
+    path = str(tmpdir)
+    index = data.pack_movement(path=path, keys=[(1, 1, 1), (0, 0, 0)])
+    assert list(index['day']) == [0, 1]
+    assert index['stop'][0] == 39181
+    t, x, y, isHB = data.load_movement_view(0, 0, 0, path=path)
+    movement = data.load_movement(0, 0, 0)
+    assert np.array_equal(t, movement['t'])
+    assert np.array_equal(y, movement['y'])
+    assert np.array_equal(isHB, movement['isHB'])
+    # views share the memory map rather than owning a copy
+    assert not t.flags.owndata
+    assert not x.flags.writeable
+
+
+def test_repack_movement(tmpdir):
+    path = str(tmpdir)
+    data.pack_movement(path=path, keys=[(0, 0, 0)])
+    t = data.load_movement_view(0, 0, 0, path=path)[0]
+    first = np.array(t)
+    # repacking moves a new store over the old one, whose views
+    # stay valid
+    data.pack_movement(path=path, keys=[(0, 0, 1)])
+    assert np.array_equal(t, first)
+    assert np.array_equal(data.load_movement_view(0, 0, 1, path=path)[0],
+                          data.load_movement(0, 0, 1)['t'])
+    assert sorted(_os.listdir(path)) == ['movement.bin',
+                                         'movement_index.npy']
+    assert packed.PACKED_DIR != _os.path.join(data.data_dir, 'packed')
+
+
+def test_load_movement_packed_subset(tmpdir, monkeypatch):
+    raw = [data.load_movement(0, 0, day) for day in (0, 1)]
+    monkeypatch.setattr(packed, 'PACKED_DIR', str(tmpdir))
+    data.clear_cache()
+    data.pack_movement(keys=[(0, 0, 0)])
+    try:
+        # mouse-days missing from the store are read from their files
+        assert data.load_movement(0, 0, 0).equals(raw[0])
+        assert data.load_movement(0, 0, 1).equals(raw[1])
+        # a store older than the files of a mouse-day is not used
+        index_file = packed._store_paths(None, 'movement')[1]
+        assert packed._packed_movement((0, 0, 0)) is not None
+        _os.utime(index_file, (0, 0))
+        assert packed._packed_movement((0, 0, 0)) is None
+    finally:
+        data.clear_cache()
+
+
+def test_load_movement_view_input(tmpdir):
+    path = str(tmpdir)
+    with pytest.raises(ValueError) as excinfo:
+        data.load_movement_view(0, 0, 0, path=path)
+    expected = "No packed movement store found; run pack_movement() first"
+    assert excinfo.value.args[0] == expected
+    data.pack_movement(path=path, keys=[(0, 0, 0)])
+    with pytest.raises(ValueError) as excinfo:
+        data.load_movement_view(0, 0, 1, path=path)
+    expected = "No data exists for strain 0, mouse 0, day 1"
+    assert excinfo.value.args[0] == expected
@@ -1,9 +1,13 @@
 from __future__ import (absolute_import, division,
                         print_function, unicode_literals)
 
+import hashlib
+from multiprocessing import Pool as _Pool
+
 import pandas as pd
 import numpy as np
 from mousestyles import data
+from mousestyles.data.cache import LoaderCache as _LoaderCache
 
 
 try:
@@ -13,7 +17,7 @@ except NameError:
 
 
 def create_time_matrix(combined_gap=4, time_gap=1,
-                       days_index=137, verbose=False):
+                       days_index=137, verbose=False, n_jobs=1):
     r"""
     Return a time matrix for estimate the MLE parobability.
     The rows are 137 mousedays. The columns are time series
@@ -33,6 +37,8 @@ def create_time_matrix(combined_gap=4, time_gap=1,
         The number of days to process, from day 0 to day days_index.
     verbose: bool
         If True, print out helpful information to the screen
+    n_jobs: positive int
+        The number of processes labelling the mouse days in parallel
 
     Returns
     -------
@@ -62,71 +68,47 @@ def create_time_matrix(combined_gap=4, time_gap=1,
     condition_time_gap = ((type(time_gap) == int or type(time_gap) ==
                            float) and time_gap > 0)
     condition_days_index = (type(days_index) == int and days_index >= 0)
+    condition_n_jobs = (type(n_jobs) == int and n_jobs > 0)
     if not condition_time_gap:
         raise ValueError("time_gap should be nonnegative int or float")
     if not condition_combined_gap:
         raise ValueError("combined_gap should be nonnegative int or float")
     if not condition_days_index:
         raise ValueError("days_index should be nonnegative int")
+    if not condition_n_jobs:
+        raise ValueError("n_jobs should be positive int")
 
-    intervals_AS = data.load_intervals('AS')
-    intervals_F = data.load_intervals('F')
-    intervals_W = data.load_intervals('W')
-    intervals_IS = data.load_intervals('IS')
+    intervals_AS = data.load_intervals_collection('AS')
+    intervals_F = dict(data.load_intervals_collection('F').items())
+    intervals_W = dict(data.load_intervals_collection('W').items())
+    stops_IS = data.load_intervals_collection('IS').endpoints[:, 1]
     # 137 days totally
-    days = np.array(intervals_AS.iloc[:, 0:3].drop_duplicates().
-                    reset_index(drop=True))
+    days = np.array(intervals_AS.keys).reshape(-1, 3)
     # set time range for columns
-    initial = int(min(intervals_IS['stop']))
-    end = int(max(intervals_IS['stop'])) + 1
+    initial = int(min(stops_IS))
+    end = int(max(stops_IS)) + 1
     columns = np.arange(initial, end + 1, time_gap)
     # result matrix
     matrix = np.zeros((days.shape[0], len(columns)))
-    # we set 0 as IS, 1 as F, 2 as W, 3 as Others
-    for i in range(days.shape[0]):
-        W = np.array(intervals_W[(intervals_W['strain'] == days[i, 0]) &
-                                 (intervals_W['mouse'] == days[i, 1]) &
-                                 (intervals_W['day'] == days[i, 2])].
-                     iloc[:, 3:5])
-        F = np.array(intervals_F[(intervals_F['strain'] == days[i, 0]) &
-                                 (intervals_F['mouse'] == days[i, 1]) &
-                                 (intervals_F['day'] == days[i, 2])].
-                     iloc[:, 3:5])
-        AS = np.array(intervals_AS[(intervals_AS['strain'] == days[i, 0]) &
-                                   (intervals_AS['mouse'] == days[i, 1]) &
-                                   (intervals_AS['day'] == days[i, 2])].
-                      iloc[:, 3:5])
-        n = W.shape[0]
-        index = (np.array(np.where(W[1:, 0] - W[0:n - 1, 1] >
-                                   combined_gap))).ravel()
-        stop_W = W[np.append(index, n - 1), 1]
-        start_W = W[np.append(0, index + 1), 0]
-        n = F.shape[0]
-        index = (np.array(np.where(F[1:, 0] - F[0:n - 1, 1] >
-                                   combined_gap))).ravel()
-        stop_F = F[np.append(index, n - 1), 1]
-        start_F = F[np.append(0, index + 1), 0]
-        n = AS.shape[0]
-        index = (np.array(np.where(AS[1:, 0] - AS[0:n - 1, 1] >
-                                   combined_gap))).ravel()
-        stop_AS = AS[np.append(index, n - 1), 1]
-        start_AS = AS[np.append(0, index + 1), 0]
-        for j in range(len(columns)):
-            if sum(np.logical_and(columns[j] > start_AS, columns[j] <
-                                  stop_AS)) != 0:
-                if sum(np.logical_and(columns[j] > start_F, columns[j] <
-                                      stop_F)) != 0:
-                    matrix[i, j] = 1  # food
-                elif sum(np.logical_and(columns[j] > start_W, columns[j] <
-                                        stop_W)) != 0:
-                    matrix[i, j] = 2  # water
-                else:
-                    matrix[i, j] = 3  # others
-        # give you the precent of matrix has been processed
-        if verbose:
-            print(i / days.shape[0], 'has been processed')
-        if i > days_index:
-            break
+    # rows up to days_index + 1 are processed
+    n_days = min(days.shape[0], days_index + 2)
+    empty = np.zeros((0, 2))
+    tasks = [(columns, intervals_AS[i].intervals,
+              intervals_F.get(key, empty).intervals,
+              intervals_W.get(key, empty).intervals, combined_gap)
+             for (i, key) in enumerate(intervals_AS.keys[:n_days])]
+    pool = _Pool(n_jobs) if n_jobs > 1 else None
+    try:
+        rows = (pool.imap(_label_mouseday, tasks) if pool is not None
+                else (_label_mouseday(task) for task in tasks))
+        for (i, row) in enumerate(rows):
+            matrix[i, :] = row
+            # give you the precent of matrix has been processed
+            if verbose:
+                print(i / days.shape[0], 'has been processed')
+    finally:
+        if pool is not None:
+            pool.terminate()
     # format data frame
     matrix = pd.DataFrame(matrix, columns=columns)
     title = pd.DataFrame(days, columns=['strain', 'mouse', 'day'])
@@ -134,7 +116,51 @@ def create_time_matrix(combined_gap=4, time_gap=1,
     return time_matrix
 
 
-def get_prob_matrix_list(time_df, interval_length=1000):
+def _combine_intervals(intervals, combined_gap):
+    r"""
+    Return the start and stop times of the intervals obtained by
+    combining the consecutive intervals whose gap is not larger than
+    combined_gap.
+    """
+    intervals = np.asarray(intervals).reshape(-1, 2)
+    n = intervals.shape[0]
+    if n == 0:
+        return np.zeros(0), np.zeros(0)
+    index = np.flatnonzero(intervals[1:, 0] - intervals[0:n - 1, 1] >
+                           combined_gap)
+    stop = intervals[np.append(index, n - 1), 1]
+    start = intervals[np.append(0, index + 1), 0]
+    return start, stop
+
+
+def _inside(times, start, stop):
+    r"""
+    Return a boolean array telling for each time whether it lies strictly
+    inside one of the intervals given by their start and stop times.
+    """
+    if start.shape[0] == 0:
+        return np.zeros(times.shape, dtype=bool)
+    order = np.argsort(start, kind='mergesort')
+    start = start[order]
+    # latest stop among the intervals starting before each start
+    reach = np.maximum.accumulate(stop[order])
+    idx = start.searchsorted(times, side='left') - 1
+    return (idx >= 0) & (reach[np.maximum(idx, 0)] > times)
+
+
+def _label_mouseday(task):
+    r"""
+    Return the states of a mouse day at the given times: 0 for IS, 1 for
+    eating, 2 for drinking and 3 for other activities in AS.
+    """
+    columns, AS, F, W, combined_gap = task
+    active = _inside(columns, *_combine_intervals(AS, combined_gap))
+    food = _inside(columns, *_combine_intervals(F, combined_gap))
+    water = _inside(columns, *_combine_intervals(W, combined_gap))
+    return np.where(active, np.where(food, 1, np.where(water, 2, 3)), 0)
+
+
+def get_prob_matrix_list(time_df, interval_length=1000, n_states=4):
     r"""
     returns a list of probability transition matrices
     that will be later used to characterize and simu-
@@ -155,6 +181,8 @@ def get_prob_matrix_list(time_df, interval_length=1000):
     interval_length: int
         an integer specifying the desired length of each
         small time interval.
+    n_states: int
+        the number of states, labelled from 0 to n_states - 1
 
     Returns
     -------
@@ -204,21 +232,94 @@ def get_prob_matrix_list(time_df, interval_length=1000):
     if not condition_interval_length:
         raise ValueError("interval_length should be positive int")
 
-    time_array = np.array(time_df)[:, 3:]
-    n = np.ceil(time_array.shape[1] / interval_length)
-    matrix_list = [None] * int(n)
-    for i in np.arange(n):
-        i = int(i)
-        ind = [(i * interval_length), ((i + 1) * interval_length)]
-        small_time_array = time_array[:, ind[0]:ind[1]]
-        small_time_list = list(small_time_array)
-        small_time_str_list = ["".join(np.char.mod('%i', a))
-                               for a in small_time_list]
-        matrix_list[i] = get_prob_matrix_small_interval(small_time_str_list)
-    return matrix_list
-
-
-def get_prob_matrix_small_interval(string_list, verbose=False):
+    return list(get_prob_matrix_array(time_df, interval_length, n_states))
+
+
+def get_prob_matrix_array(time_df, interval_length=1000, n_states=4):
+    r"""
+    returns the probability transition matrices of all
+    the small time intervals at once, as the array version
+    of get_prob_matrix_list. Transitions are counted on
+    the integer states of each mouse day, encoding the
+    transition from state i to state j as n_states * i + j.
+
+    Parameters
+    ----------
+    time_df: Pandas.DataFrame
+        a huge data frame containing info on strain, mouse
+        no., mouse day, and different states at chosen time
+        points.
+    interval_length: int
+        an integer specifying the desired length of each
+        small time interval.
+    n_states: int
+        the number of states, labelled from 0 to n_states - 1
+
+    Returns
+    -------
+    matrices: numpy.ndarray
+        a (number of intervals, n_states, n_states) array of
+        the mle estimations of the probability transition
+        matrices for each small time interval.
+
+    Examples
+    --------
+    >>> row_i = np.hstack((np.zeros(13), np.ones(10),
+                            np.ones(10)*2, np.ones(10)*3))
+    >>> time_df_eg = np.vstack((row_i, row_i,row_i))
+    >>> time_df_eg = pd.DataFrame(time_df_eg)
+    >>> get_prob_matrix_array(time_df_eg, interval_length=10).shape
+    (4, 4, 4)
+    """
+    # check all the inputs
+    condition_time_df = isinstance(time_df, pd.core.frame.DataFrame)
+    condition_interval_length = isinstance(interval_length, int) and \
+        interval_length > 0
+    condition_n_states = isinstance(n_states, int) and n_states > 0
+
+    if not condition_time_df:
+        raise ValueError("time_df should be pandas DataFrame")
+    if not condition_interval_length:
+        raise ValueError("interval_length should be positive int")
+    if not condition_n_states:
+        raise ValueError("n_states should be positive int")
+
+    time_array = np.array(time_df)[:, 3:].astype(int)
+    n = int(np.ceil(time_array.shape[1] / interval_length))
+    # time t and t + 1 must be in the same small interval
+    t = np.arange(time_array.shape[1] - 1)
+    same = (t + 1) % interval_length != 0
+    windows = np.broadcast_to(t // interval_length, time_array[:, 1:].shape)
+    counts = _count_transitions(time_array[:, :-1], time_array[:, 1:],
+                                windows, same, n, n_states)
+    return _normalize_rows(counts)
+
+
+def _count_transitions(states_from, states_to, windows, mask, n_windows,
+                       n_states):
+    r"""
+    Return the (n_windows, n_states, n_states) array counting the
+    transitions from states_from to states_to in each window, skipping
+    the masked out transitions and the unknown states.
+    """
+    mask = mask & (states_from >= 0) & (states_from < n_states) & \
+        (states_to >= 0) & (states_to < n_states)
+    code = (windows * n_states + states_from) * n_states + states_to
+    counts = np.bincount(code[mask], minlength=n_windows * n_states ** 2)
+    return counts.reshape(n_windows, n_states, n_states).astype(float)
+
+
+def _normalize_rows(counts):
+    r"""
+    Divide the rows of the count matrices by their sums, leaving the
+    rows without transitions at 0.
+    """
+    totals = counts.sum(axis=-1, keepdims=True)
+    return np.divide(counts, totals, out=np.zeros_like(counts),
+                     where=totals != 0)
+
+
+def get_prob_matrix_small_interval(string_list, verbose=False, n_states=4):
     r"""
     return the MLE estimate of the probability matrix
     of the markov chain model. The data used as input
@@ -235,6 +336,8 @@ def get_prob_matrix_small_interval(string_list, verbose=False):
         time slot.
     verbose: bool
         If True, print out helpful information to the screen
+    n_states: int
+        the number of states, labelled from 0 to n_states - 1
 
     Returns
     -------
@@ -264,22 +367,18 @@ def get_prob_matrix_small_interval(string_list, verbose=False):
     if not condition_list_item:
         raise ValueError("items in string_list should be str")
 
-    Mat_prob = np.zeros(4 * 4).reshape(4, 4)
-    for i in np.arange(4):
-        i = int(i)
-        for j in np.arange(4):
-            j = int(j)
-            ijth = str(i) + str(j)
-            Mat_prob[i, j] = sum([string.count(ijth) for string
-                                  in string_list])
-    for k in np.arange(4):
-        k = int(k)
-        if sum(Mat_prob[k, :]) != 0:
-            Mat_prob[k, :] = Mat_prob[k, :] / sum(Mat_prob[k, :])
-    return Mat_prob
-
-
-def mcmc_simulation(mat_list, n_per_int):
+    # every pair of consecutive characters is a transition, including
+    # overlapping ones such as the two 00 in 000
+    states = [np.frombuffer(string.encode('ascii'), dtype=np.uint8)
+              .astype(int) - ord('0') for string in string_list]
+    states_from = np.concatenate([s[:-1] for s in states] + [[]])
+    states_to = np.concatenate([s[1:] for s in states] + [[]])
+    counts = _count_transitions(states_from.astype(int),
+                                states_to.astype(int), 0, True, 1, n_states)
+    return _normalize_rows(counts)[0]
+
+
+def mcmc_simulation(mat_list, n_per_int, n_chains=None, rng=None):
     r"""
     This function gives the Monte Carlo simulation
     of the stochastic process modeling the dynamic
@@ -290,6 +389,8 @@ def mcmc_simulation(mat_list, n_per_int):
     is related to the interval_length parameter in
     function get_prob_matrix_list. The output is an
     array of numbers, each indicates one state.
+    Many independent chains can be simulated at once,
+    advancing in lockstep.
 
     Parameters
     ----------
@@ -303,13 +404,24 @@ def mcmc_simulation(mat_list, n_per_int):
         This is the same as the parameter
         interval_length used in the function
         get_prob_matrix_small_interval
+    n_chains: int, optional
+        the number of independent chains to simulate;
+        if None, a single chain is simulated
+    rng: numpy.random.RandomState or numpy.random.Generator, optional
+        the generator of the random numbers, drawn with its
+        uniform method; if None, the global numpy.random state
+        is used, so that np.random.seed reproduces the earlier
+        results
 
     Returns
     -------
     simu_result: numpy.array
         an array of integers indicating the simulated
         states given a list of probability transition
-        matrices.
+        matrices, or a (n_chains, n * n_per_int) array of
+        integers with one chain per row if n_chains is given.
+        A chain in a state whose row of transition
+        probabilities is all zero stays in that state.
 
     Examples
     --------
@@ -324,6 +436,9 @@ def mcmc_simulation(mat_list, n_per_int):
     >>> mcmc_simulation(mat_list_example, 10)
     >>> array([0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
                 1, 0, 1, 0, 1, 0, 1, 0, 1, 0])
+    >>> mcmc_simulation(mat_list_example, 10, n_chains=1000,
+                        rng=np.random.RandomState(0)).shape
+    >>> (1000, 20)
     """
     # check all the inputs
     condition_mat_list = (type(mat_list) == list)
@@ -335,21 +450,33 @@ def mcmc_simulation(mat_list, n_per_int):
         raise ValueError("items in mat_list should be numpy array")
     if not condition_n_per_int:
         raise ValueError("n_per_int should be positive int")
-
-    n = len(mat_list)
-    simu_result = np.zeros(n * n_per_int)
-    for i in np.arange(n):
-        for j in np.arange(n_per_int):
-            index = int(i * n_per_int + j)
-            if index == 0:
-                simu_result[index] = 0
-            state_i = simu_result[int(index - 1)]
-            prob_trans = mat_list[i][int(state_i), :]
-            prob_trans = np.cumsum(prob_trans)
-            rand = np.random.uniform()
-            state_j = sum(rand > prob_trans)
-            simu_result[index] = int(state_j)
-    simu_result = np.array(simu_result, dtype=int)
+    condition_n_chains = (n_chains is None or
+                          (type(n_chains) == int and n_chains > 0))
+    if not condition_n_chains:
+        raise ValueError("n_chains should be positive int")
+
+    # cumulative transition probabilities, rows with no transition
+    # keep the chain in its state
+    mats = np.array(mat_list, dtype=float)
+    k = mats.shape[1]
+    cum_mats = np.cumsum(mats, axis=2)
+    stay = np.triu(np.ones((k, k)))
+    zero_rows = mats.sum(axis=2) == 0
+    cum_mats[zero_rows] = np.broadcast_to(stay, mats.shape)[zero_rows]
+    n_steps = len(mat_list) * n_per_int
+    chains = 1 if n_chains is None else n_chains
+    random = np.random if rng is None else rng
+    simu_result = np.zeros((chains, n_steps), dtype=int)
+    # every chain starts from state 0
+    state = np.zeros(chains, dtype=int)
+    for index in range(n_steps):
+        prob_trans = cum_mats[index // n_per_int, state]
+        rand = random.uniform(size=chains)
+        state = np.minimum((rand[:, np.newaxis] > prob_trans).sum(axis=1),
+                           k - 1)
+        simu_result[:, index] = state
+    if n_chains is None:
+        return simu_result[0]
     return simu_result
 
 
@@ -447,8 +574,94 @@ def get_score(true_day, simulated_day, weight=[1, 10, 50, 1]):
     return score
 
 
+def score_matrix(true_days, simulated_days, weight=[1, 10, 50, 1],
+                 chunk_size=4096):
+    r"""
+    Returns the scores of get_score of every true day against every
+    simulated day. Each day is encoded with one indicator per state,
+    weighted by the reward of the state for the true days, so that the
+    scores are sums of matrix products over the states. The time
+    points are processed in chunks to bound the memory used.
+
+    Parameters
+    ----------
+    true_days: numpy.array
+        a (n_true, n_time) array of the states of the true days,
+        or the array of the states of a single day
+    simulated_days: numpy.array
+        a (n_sim, n_simulated_time) array of the states of the
+        simulated days, or the array of the states of a single day;
+        only the first n_time states are compared
+    weight: list
+        a list with positive numbers showing the rewards
+        for making the right predictions of various status.
+    chunk_size: positive int
+        the number of time points encoded at once
+
+    Returns
+    -------
+    scores: numpy.array
+        a (n_true, n_sim) array whose entry i, j is the score of
+        get_score of the true day i against the simulated day j.
+
+    Examples
+    --------
+    >>> true_days = np.vstack((np.zeros(13), np.ones(13)))
+    >>> simulated_days = np.ones((3, 13))
+    >>> score_matrix(true_days, simulated_days)
+    >>> array([[  0.,   0.,   0.],
+               [ 10.,  10.,  10.]])
+    """
+    # check all the inputs
+    condition_true_days = (isinstance(true_days, np.ndarray))
+    condition_simulated_days = (isinstance(simulated_days, np.ndarray))
+    condition_weight = (isinstance(weight, list))
+    condition_chunk_size = (type(chunk_size) == int and chunk_size > 0)
+
+    if not condition_true_days:
+        raise ValueError("true_days should be numpy array")
+    if not condition_simulated_days:
+        raise ValueError("simulated_days should be numpy array")
+    if not condition_weight:
+        raise ValueError("weight should be list")
+    if not condition_chunk_size:
+        raise ValueError("chunk_size should be positive int")
+
+    len_weight = len(weight)
+    if len_weight != 4:
+        raise ValueError("Length of weight should be 4")
+
+    # check all the weights are positive
+    for w in weight:
+        if w <= 0:
+            raise ValueError("All the weights should be positive")
+
+    true_days = np.atleast_2d(true_days)
+    simulated_days = np.atleast_2d(simulated_days)
+    len_true = true_days.shape[1]
+    if len_true > simulated_days.shape[1]:
+        raise ValueError("Length of simulated_day is smaller than true_day")
+
+    states = np.arange(len_weight)
+    rewards = np.asarray(weight, dtype=float)
+    scores = np.zeros((true_days.shape[0], simulated_days.shape[0]))
+    for start in range(0, len_true, chunk_size):
+        stop = min(start + chunk_size, len_true)
+        true_chunk = true_days[:, start:stop]
+        simulated_chunk = simulated_days[:, start:stop]
+        for state in states:
+            scores += np.dot((true_chunk == state) * rewards[state],
+                             (simulated_chunk == state).T)
+    return scores / len_true
+
+
+# fits of find_best_interval, keyed by their data, candidates and seed
+_fit_cache = _LoaderCache()
+
+
 def find_best_interval(df, strain_num,
-                       interval_length_initial=np.arange(600, 7800, 600)):
+                       interval_length_initial=np.arange(600, 7800, 600),
+                       n_jobs=1, seed=0):
     r"""
     Returns the optimized time interval length and the corresponding
     fake mouse behavior string with the evaluation score for a
@@ -459,7 +672,10 @@ def find_best_interval(df, strain_num,
     are the optimized time interval length, the simulated mouse states
     string using that optimized time interval and the evaluation score
     comparing this simulated mouse with the real mice behavior in the
-    strain using the same optimized time interval length.
+    strain using the same optimized time interval length. The candidates
+    can be evaluated in parallel, and the fit is remembered, so calling
+    the function again with the same data, strain, candidates and seed
+    does not refit.
 
     Parameters
     ----------
@@ -474,6 +690,10 @@ def find_best_interval(df, strain_num,
         that it optimizes on, with the default value of a sequence
         from 600s to 7200s with 600s step since 10min to 2h is a
         reasonable choice.
+    n_jobs: positive int
+        the number of processes evaluating the candidates in parallel
+    seed: int
+        the seed of the simulation of each candidate
 
     Returns
     -------
@@ -499,7 +719,7 @@ def find_best_interval(df, strain_num,
     >>> find_best_interval(time_df_eg, 0, np.arange(10, 40, 10))
     (10, array([0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
     0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-    0, 0]), 0.98245614035087725)
+    0, 0]), 1.0)
     """
     # check all the inputs: dataframe, strain number, intitial time length
     condition_df = (type(df) == pd.core.frame.DataFrame)
@@ -517,28 +737,70 @@ def find_best_interval(df, strain_num,
         raise ValueError("strain_num can only be 0, 1, 2")
     if not condition_interval_length_initial:
         raise ValueError("interval_length_initial positive np.array")
+    condition_n_jobs = (type(n_jobs) == int and n_jobs > 0)
+    if not condition_n_jobs:
+        raise ValueError("n_jobs should be positive int")
 
     interval_length_initial = [int(interval_length) for interval_length in
                                interval_length_initial]
     data_strain = df[df.strain == strain_num]
-    time_score = []
-    store_fake_mouse = []
-    for interval_length in interval_length_initial:
-        prob_matrix_list = get_prob_matrix_list(data_strain, interval_length)
-        np.random.seed([0])
-        fake_mouse = mcmc_simulation(prob_matrix_list, interval_length)
-        store_fake_mouse.append(fake_mouse)
-        real_mouse = data_strain.ix[:, 3:]
-        real_mouse = real_mouse.reset_index()
-        n_mouse = len(real_mouse)
-        mouse_score = np.zeros(n_mouse)
-        for mouse_index in range(0, n_mouse):
-            real_mouse_list = list(real_mouse.ix[mouse_index, :])
-            mouse_score[mouse_index] = get_score(np.array(real_mouse_list),
-                                                 fake_mouse)
-        time_score.append(np.mean(mouse_score))
-    best_score = max(time_score)
-    best_score_index = time_score.index(best_score)
+    digest = hashlib.sha1(np.ascontiguousarray(
+        data_strain.values, dtype=float)).hexdigest()
+    key = ('find_best_interval', digest, data_strain.shape, strain_num,
+           tuple(interval_length_initial), seed)
+    return _fit_cache.get(key, (), lambda: _fit_best_interval(
+        data_strain, interval_length_initial, n_jobs, seed))
+
+
+def _fit_best_interval(data_strain, interval_length_initial, n_jobs, seed):
+    r"""
+    Return the best interval length, its simulated mouse and its score
+    among the candidate interval lengths, see find_best_interval.
+    """
+    tasks = [(interval_length, seed)
+             for interval_length in interval_length_initial]
+    if n_jobs > 1:
+        # the data are sent once to each process rather than with
+        # every candidate
+        pool = _Pool(min(n_jobs, len(tasks)), _set_fit_data,
+                     (data_strain,))
+        try:
+            fits = pool.map(_fit_interval, tasks)
+        finally:
+            pool.terminate()
+    else:
+        _set_fit_data(data_strain)
+        try:
+            fits = [_fit_interval(task) for task in tasks]
+        finally:
+            _set_fit_data(None)
+    time_score = [score for (_, score) in fits]
+    best_score_index = int(np.argmax(time_score))
     best_interval_length = interval_length_initial[best_score_index]
-    best_fake_mouse = store_fake_mouse[best_score_index]
+    best_fake_mouse, best_score = fits[best_score_index]
     return best_interval_length, best_fake_mouse, best_score
+
+
+# strain data of the candidates evaluated by _fit_interval
+_fit_data = None
+
+
+def _set_fit_data(data_strain):
+    global _fit_data
+    _fit_data = data_strain
+
+
+def _fit_interval(task):
+    r"""
+    Simulate a mouse with the transition matrices estimated on
+    intervals of the given length, and return it with its mean score
+    against the real mice of the strain.
+    """
+    interval_length, seed = task
+    data_strain = _fit_data
+    prob_matrix_list = get_prob_matrix_list(data_strain, interval_length)
+    # seeded with a sequence to reproduce the earlier fits
+    rng = np.random.RandomState([seed])
+    fake_mouse = mcmc_simulation(prob_matrix_list, interval_length, rng=rng)
+    real_mouse = np.array(data_strain)[:, 3:].astype(int)
+    return fake_mouse, np.mean(score_matrix(real_mouse, fake_mouse))
@@ -7,8 +7,10 @@ import pandas as pd
 
 from mousestyles.dynamics import (create_time_matrix,
                                   get_prob_matrix_list,
+                                  get_prob_matrix_array,
                                   get_prob_matrix_small_interval,
                                   mcmc_simulation, get_score,
+                                  score_matrix,
                                   find_best_interval)
 
 
@@ -37,12 +39,22 @@ def test_creat_time_matrix_input():
     with pytest.raises(ValueError) as excinfo:
         create_time_matrix(combined_gap=4, time_gap=1, days_index=0.1)
     assert excinfo.value.args[0] == "days_index should be nonnegative int"
+    # n_jobs is not positive
+    with pytest.raises(ValueError) as excinfo:
+        create_time_matrix(combined_gap=4, time_gap=1, n_jobs=0)
+    assert excinfo.value.args[0] == "n_jobs should be positive int"
 
 
 def test_creat_time_matrix():
     # Checking functions output the correct time matrix
     matrix = create_time_matrix(combined_gap=4, time_gap=1, days_index=0)
     assert matrix.iloc[0, 2181] == 1.0
+    # rows after days_index + 1 are left at 0
+    assert matrix.iloc[1, 3:].any()
+    assert not matrix.iloc[2:, 3:].values.any()
+    parallel = create_time_matrix(combined_gap=4, time_gap=1, days_index=0,
+                                  n_jobs=2)
+    assert parallel.equals(matrix)
 
 
 def test_get_prob_matrix_list_input():
@@ -99,6 +111,26 @@ def test_get_prob_matrix_small_interval():
     assert example[0, 2] == 0.2
     assert example[1, 2] == 1.
     assert sum(example[0, :]) == 1.
+    # overlapping transitions are all counted
+    example = get_prob_matrix_small_interval(['0001', '1'])
+    assert example[0, 0] == 2. / 3
+    assert get_prob_matrix_small_interval(['012'], n_states=2)[0, 1] == 1.
+
+
+def test_get_prob_matrix_array():
+    row_i = np.hstack((np.zeros(13), np.ones(10),
+                       np.ones(10) * 2, np.ones(10) * 3))
+    time_df_eg = pd.DataFrame(np.vstack((row_i, row_i, row_i)))
+    mat_array = get_prob_matrix_array(time_df_eg, interval_length=10)
+    assert mat_array.shape == (4, 4, 4)
+    assert np.array_equal(mat_array[1], np.diag([0., 1, 0, 0]))
+    mat_list = get_prob_matrix_list(time_df_eg, interval_length=10)
+    assert all(np.array_equal(a, b) for (a, b) in zip(mat_array, mat_list))
+    assert get_prob_matrix_array(time_df_eg, 10, n_states=2).shape == \
+        (4, 2, 2)
+    with pytest.raises(ValueError) as excinfo:
+        get_prob_matrix_array(time_df_eg, 10, n_states=0)
+    assert excinfo.value.args[0] == "n_states should be positive int"
 
 
 def test_mcmc_simulation_input():
@@ -147,6 +179,53 @@ def test_mcmc_simulation():
     assert example[11] == 0.
 
 
+def test_mcmc_simulation_chains():
+    mat0 = np.zeros(16).reshape(4, 4)
+    np.fill_diagonal(mat0, val=1)
+    mat1 = np.zeros(16).reshape(4, 4)
+    mat1[0, 1] = 1
+    mat1[1, 0] = 1
+    mat1[2, 2] = 1
+    mat1[3, 3] = 1
+    with pytest.raises(ValueError) as excinfo:
+        mcmc_simulation([mat0, mat1], 10, n_chains=0)
+    assert excinfo.value.args[0] == "n_chains should be positive int"
+    # deterministic chains all follow the same path
+    example = mcmc_simulation([mat0, mat1], 10, n_chains=3,
+                              rng=np.random.RandomState(0))
+    assert example.shape == (3, 20)
+    assert (example == mcmc_simulation([mat0, mat1], 10)).all()
+    assert example.dtype == mcmc_simulation([mat0, mat1], 10).dtype
+    # the first state is drawn from the row of state 0
+    mat2 = np.full((4, 4), 0.25)
+    example = mcmc_simulation([mat2], 50, n_chains=2000,
+                              rng=np.random.RandomState(0))
+    counts = np.bincount(example.ravel(), minlength=4) / example.size
+    assert np.allclose(counts, 0.25, atol=0.01)
+    # a chain without transitions stays in its state
+    mat3 = np.zeros((4, 4))
+    mat3[0, 2] = 1
+    example = mcmc_simulation([mat3], 5)
+    assert (example == 2).all()
+    # seeding the global state reproduces a single chain
+    np.random.seed(0)
+    first = mcmc_simulation([mat2], 50)
+    np.random.seed(0)
+    assert (first == mcmc_simulation([mat2], 50)).all()
+
+
+@pytest.mark.skipif(not hasattr(np.random, 'default_rng'),
+                    reason="numpy.random.Generator is not available")
+def test_mcmc_simulation_generator():
+    mat = np.full((4, 4), 0.25)
+    first = mcmc_simulation([mat], 50, n_chains=3,
+                            rng=np.random.default_rng(0))
+    second = mcmc_simulation([mat], 50, n_chains=3,
+                             rng=np.random.default_rng(0))
+    assert first.shape == (3, 50)
+    assert (first == second).all()
+
+
 def test_get_score_input():
     # checking functions raise the correct errors for wrong input
     # true_day is not numpy.array
@@ -193,6 +272,36 @@ def test_get_score():
     assert score_2 == 10.0
 
 
+def test_score_matrix():
+    with pytest.raises(ValueError) as excinfo:
+        score_matrix(true_days=0, simulated_days=np.zeros(13))
+    assert excinfo.value.args[0] == "true_days should be numpy array"
+    with pytest.raises(ValueError) as excinfo:
+        score_matrix(np.zeros(13), np.zeros(13), weight=[1, 1, 1])
+    assert excinfo.value.args[0] == "Length of weight should be 4"
+    with pytest.raises(ValueError) as excinfo:
+        score_matrix(np.zeros(13), np.zeros(12))
+    assert excinfo.value.args[0] == ("Length of simulated_day is smaller "
+                                     "than true_day")
+    with pytest.raises(ValueError) as excinfo:
+        score_matrix(np.zeros(13), np.zeros(13), chunk_size=0)
+    assert excinfo.value.args[0] == "chunk_size should be positive int"
+    # every entry is the score of get_score
+    rng = np.random.RandomState(0)
+    true_days = rng.randint(0, 4, size=(5, 50))
+    simulated_days = rng.randint(0, 4, size=(7, 60))
+    simulated_days[0, :50] = true_days[0]
+    scores = score_matrix(true_days, simulated_days, chunk_size=16)
+    assert scores.shape == (5, 7)
+    expected = [[get_score(true_day, simulated_day)
+                 for simulated_day in simulated_days]
+                for true_day in true_days]
+    assert np.allclose(scores, expected)
+    # single days are accepted
+    assert np.allclose(score_matrix(true_days[0], simulated_days[0]),
+                       scores[0, 0])
+
+
 def test_find_best_interval_input():
     # checking functions raise the correct errors for wrong input
     # time_df is not DataFrame
@@ -233,3 +342,29 @@ def test_find_best_interval():
     assert time == 10
     assert np.array_equal(fake, np.zeros(40))
     assert 1 - score < 0.05
+
+
+def test_find_best_interval_fit():
+    row_i = np.hstack((np.zeros(13), np.ones(10),
+                       np.ones(10) * 2, np.ones(10) * 3))
+    time_df_eg = pd.DataFrame(np.vstack((row_i, row_i, row_i)))
+    time_df_eg.rename(columns={0: 'strain'}, inplace=True)
+    with pytest.raises(ValueError) as excinfo:
+        find_best_interval(time_df_eg, 0, np.arange(10, 40, 10), n_jobs=0)
+    assert excinfo.value.args[0] == "n_jobs should be positive int"
+    time, fake, score = find_best_interval(time_df_eg, 0,
+                                           np.arange(10, 40, 10))
+    # the score is the mean get_score of the real mice
+    real = np.array(time_df_eg)[:, 3:]
+    assert np.isclose(score, np.mean([get_score(day, fake) for day in real]))
+    # the global random state is left alone
+    np.random.seed(1)
+    state = np.random.get_state()[1].copy()
+    find_best_interval(time_df_eg, 0, np.arange(10, 40, 10), seed=2)
+    assert (np.random.get_state()[1] == state).all()
+    # the fit is remembered and does not depend on the processes
+    fake[:] = -1
+    assert find_best_interval(time_df_eg, 0, np.arange(10, 40, 10),
+                              n_jobs=2)[0] == time
+    assert (find_best_interval(time_df_eg, 0,
+                               np.arange(10, 40, 10))[1] >= 0).all()
@@ -32,6 +32,12 @@ def getdistance(strain, mouse, day):
     1.01191156,  1.00423354])
     """
     df = data.load_movement(strain, mouse, day)
+    return _cut_distance(df)
+
+
+def _cut_distance(df):
+    """ Return the distances bigger than 1cm between consecutive points
+        of a movement data frame. """
     xcood = df["x"]
     ycood = df["y"]
     distance_vector = np.sqrt(np.diff(xcood)**2 + np.diff(ycood)**2)
@@ -64,6 +70,10 @@ def fit_powerlaw(strain, mouse, day):
     9.4748705008269827
     """
     cut_dist = getdistance(strain, mouse, day)
+    return _powerlaw_mle(cut_dist)
+
+
+def _powerlaw_mle(cut_dist):
     ret_mle = 1 + len(cut_dist) * 1 / \
         (np.sum(np.log(cut_dist / np.min(cut_dist))))
     return ret_mle
@@ -93,6 +103,10 @@ def fit_exponential(strain, mouse, day):
     7.385844980814098
     """
     cut_dist = getdistance(strain, mouse, day)
+    return _exponential_mle(cut_dist)
+
+
+def _exponential_mle(cut_dist):
     ret_mle = len(cut_dist) / (np.sum(cut_dist) - len(cut_dist))
     return ret_mle
 
@@ -116,19 +130,15 @@ def fit_dist_all():
     7.385844980814098
     """
     esti_df = {"strain": [], "mouse": [], "day": [], "power": [], "exp": []}
-    for i in range(3):
-        for j in range(4):
-            for k in range(12):
-                try:
-                    temp1 = fit_powerlaw(i, j, k)
-                    temp2 = fit_exponential(i, j, k)
-                    esti_df["strain"].append(i)
-                    esti_df["mouse"].append(j)
-                    esti_df["day"] .append(k)
-                    esti_df["power"] .append(temp1)
-                    esti_df["exp"] .append(temp2)
-                except:
-                    next
+    for ((i, j, k), df) in data.load_movements(data.load_catalog()):
+        cut_dist = _cut_distance(df)
+        temp1 = _powerlaw_mle(cut_dist)
+        temp2 = _exponential_mle(cut_dist)
+        esti_df["strain"].append(i)
+        esti_df["mouse"].append(j)
+        esti_df["day"] .append(k)
+        esti_df["power"] .append(temp1)
+        esti_df["exp"] .append(temp2)
     estimation = pd.DataFrame(
         esti_df, columns=["strain", "mouse", "day", "power", "exp"])
     return estimation
@@ -69,28 +69,20 @@ class Intervals(object):
                 (self.intervals[:, 1] >= self.intervals[:, 0]).all())
 
     def _make_disjoint(self):
-        """ Remove intervals [a, b] with a > b """
+        """ Remove intervals [a, b] with a > b and union together
+            intervals that overlap or touch
+            (one sweep with a running maximum of the sorted stops) """
         good_intervals_idx = self.intervals[:, 1] >= self.intervals[:, 0]
-        self.intervals = self.intervals[good_intervals_idx, :]
-        # union together intervals that overlap
-        tot = None
-        curr_idx = 0
-        curr_lhs = self.intervals[curr_idx, 0]
-        curr_rhs = self.intervals[curr_idx, 1]
-        while curr_idx < self.intervals.shape[0]:
-            while curr_rhs >= self.intervals[curr_idx, 0]:
-                curr_rhs = max(curr_rhs, self.intervals[curr_idx, 1])
-                curr_idx += 1
-                if curr_idx >= self.intervals.shape[0]:
-                    break
-            if tot is None:
-                tot = np.array([curr_lhs, curr_rhs])
-            else:
-                tot = np.vstack((tot, np.array([curr_lhs, curr_rhs])))
-            if curr_idx < self.intervals.shape[0]:
-                curr_lhs = self.intervals[curr_idx, 0]
-                curr_rhs = self.intervals[curr_idx, 1]
-        self.intervals = np.atleast_2d(tot)
+        self.intervals = _sweep(self.intervals[good_intervals_idx, :])
+
+    @classmethod
+    def _from_sorted(cls, intervals):
+        """ New Intervals object from an (M x 2) array already sorted and
+            disjoint (skips the sort and the disjoint check) """
+        F = cls()
+        if intervals.shape[0] != 0:
+            F.intervals = intervals
+        return F
 
     def copy(self):
         return Intervals(self.intervals.copy())
@@ -111,6 +103,17 @@ class Intervals(object):
             return True
         return False
 
+    def contains_many(self, times):
+        """ Vectorized contains: returns a boolean array telling for each
+            element of times whether it is in the Finite Union of Intervals.
+            (one searchsorted over the sorted endpoints) """
+        times = np.asarray(times)
+        if self.is_empty():
+            return np.zeros(times.shape, dtype=bool)
+        idx = self.intervals[:, 0].searchsorted(times, side='right') - 1
+        inside = self.intervals[np.maximum(idx, 0), 1] >= times
+        return (idx >= 0) & inside
+
     def index_of_first_intersection(self, x, find_nearest=False):
         """ finds interval nearest to given number x and containing x
             if find_nearest=False: doesn't require x to be in the interval """
@@ -151,16 +154,42 @@ class Intervals(object):
             return self
         if self.is_empty():
             return F
-        return Intervals(np.vstack((self.intervals, F.intervals)))
+        return Intervals.union_all([self, F])
+
+    @staticmethod
+    def union_all(list_of_intervals):
+        """ New Intervals object which is the union of all the Intervals
+            in list_of_intervals
+            (one stable sort of the already sorted runs and one sweep) """
+        ivts = [F.intervals for F in list_of_intervals if not F.is_empty()]
+        if len(ivts) == 0:
+            return Intervals()
+        ivt = np.vstack(ivts)
+        idx = ivt[:, 0].argsort(kind='mergesort')
+        return Intervals._from_sorted(_sweep(ivt[idx, :]))
 
     def intersect(self, F):
         """ New Intervals object which is the intersection of self and
-            Intervals F. """
+            Intervals F.  Intersections reduced to a point are dropped.
+            (merge of the two sorted endpoint arrays) """
         if F.is_empty():
             return F
         if self.is_empty():
             return self
-        return ~(~self + ~F)
+        A, B = self.intervals, F.intervals
+        # intervals of B overlapping the i-th interval of A are the ones
+        # with index in [lo[i], hi[i])
+        lo = B[:, 1].searchsorted(A[:, 0], side='right')
+        hi = B[:, 0].searchsorted(A[:, 1], side='left')
+        counts = np.maximum(hi - lo, 0)
+        idx_a = np.repeat(np.arange(A.shape[0]), counts)
+        offsets = np.cumsum(counts) - counts
+        idx_b = (np.arange(counts.sum()) - np.repeat(offsets, counts) +
+                 np.repeat(lo, counts))
+        I = np.zeros((idx_a.shape[0], 2))
+        I[:, 0] = np.maximum(A[idx_a, 0], B[idx_b, 0])
+        I[:, 1] = np.minimum(A[idx_a, 1], B[idx_b, 1])
+        return Intervals._from_sorted(I[I[:, 1] > I[:, 0], :])
 
     def intersect_with_interval(self, a, b):
         """ returns (not a copy) Intervals object which is the intersection
@@ -168,13 +197,15 @@ class Intervals(object):
             (faster than intersect) """
         if self.is_empty():
             return self
-        if (self.intervals[:, 1] > a).sum() == 0 or \
-           (self.intervals[:, 0] < b).sum() == 0:
-            return Intervals()
-        idx_first_gta = (self.intervals[:, 1] > a).nonzero()[0][0]
-        idx_last_ltb = self.intervals.shape[
-            0] - (self.intervals[:, 0] < b)[::-1].nonzero()[0][0]
-        return Intervals(self.intervals[idx_first_gta:idx_last_ltb, :])
+        # stops are sorted as well as starts
+        idx_first_gta = self.intervals[:, 1].searchsorted(a, side='right')
+        idx_last_ltb = self.intervals[:, 0].searchsorted(b, side='left')
+        return Intervals._from_sorted(
+            self.intervals[idx_first_gta:idx_last_ltb, :])
+
+    def overlap_index(self):
+        """ OverlapIndex answering window queries on self """
+        return OverlapIndex(self)
 
     def complement(self):
         """ New Intervals object which is the complement of self. """
@@ -196,7 +227,9 @@ class Intervals(object):
             I = np.vstack((np.array([-np.inf, a]), I))
         if b < np.inf:
             I = np.vstack((I, np.array([b, np.inf])))
-        return Intervals() if I.shape[0] == 0 else Intervals(I)
+        # the endpoints are sorted: only point intervals of self leave
+        # touching intervals to union together
+        return Intervals._from_sorted(_sweep(I))
 
     def measure(self):
         if self.is_empty():
@@ -204,6 +237,18 @@ class Intervals(object):
         diff_arr = self.intervals[:, 1] - self.intervals[:, 0]
         return diff_arr.sum()
 
+    def measure_per_bin(self, edges):
+        """ Measure of self in each bin [edges[i], edges[i + 1]], the
+            edges being sorted
+            (differences of the cumulative measure at the edges) """
+        edges = np.asarray(edges, dtype=np.double)
+        if self.is_empty():
+            return np.zeros(max(edges.shape[0] - 1, 0))
+        idx = self.intervals[:, 0].searchsorted(edges, side='right')
+        return np.diff(_cumulative_measure(self.intervals,
+                                           _prefix_measure(self.intervals),
+                                           idx, 0, edges))
+
     def trim(self, eps=0.001):
         """ Removes intervals with lengths <= eps. """
         if self.is_empty():
@@ -214,37 +259,42 @@ class Intervals(object):
         return self
 
     def connect_gaps(self, eps=0.001):
-        """ connects consecutive intervals separated by lengths <= eps """
-        H = ~self
-        diff_arr = H.intervals[:, 1] - H.intervals[:, 0]
-        idx = diff_arr <= eps
-        if idx.sum() == 0:
+        """ connects consecutive intervals separated by lengths <= eps
+            (gaps skip point intervals, as in the complement) """
+        if self.is_empty():
             return self
-        B = Intervals(H.intervals[idx, :])
-        A = self.union(B)
-        self.intervals = A.intervals
+        connected = _connect_gaps(self.intervals,
+                                  np.zeros(self.intervals.shape[0], int),
+                                  _gap_rule(eps))
+        if connected is not None:
+            self.intervals = connected[0]
         return self
 
-    def connect_gaps_by_rule(self, rule):
+    def connect_gaps_by_rule(self, rule, vectorized=False):
         """ Returns a new object with gaps connected when rule returns True.
 
         Parameters
-            rule: Callable that takes parameters start_time and end_time.
+            rule: Callable that takes parameters stop_time and
+                start_time of the next interval, or a number, connecting
+                gaps with lengths <= rule.
+            vectorized: If True, rule is called once with the arrays of
+                stop and start times of all the gaps and returns a
+                boolean array, e.g. lambda stops, starts: starts - stops
+                < 5.
         """
         if self.is_empty():
             return self
-        new_intervals = []
-        i = 0
-        dim = self.intervals.shape[0]
-        while i < dim:
-            a = self.intervals[i, 0]
-            while i + 1 < dim and rule(self.intervals[i, 1],
-                                       self.intervals[i + 1, 0]):
-                i += 1
-            b = self.intervals[i, 1]
-            new_intervals.append([a, b])
-            i += 1
-        return Intervals(np.array(new_intervals))
+        ivt = self.intervals
+        stops, starts = ivt[:-1, 1], ivt[1:, 0]
+        if not callable(rule):
+            join = _gap_rule(rule)(stops, starts)
+        elif vectorized:
+            join = np.asarray(rule(stops, starts), dtype=bool)
+        else:
+            join = np.array([bool(rule(stop, start))
+                             for (stop, start) in zip(stops, starts)],
+                            dtype=bool)
+        return Intervals._from_sorted(_join(ivt, join))
 
     def remove(self, other):
         return self.intersect(~other)
@@ -257,16 +307,16 @@ class Intervals(object):
             elements of arr
             (NOTE: arr is assumed sorted)
         """
-        arr = np.array(arr)
-        F = Intervals()
-        for interval in self.intervals:
-            a, b = interval[0], interval[1]
-            idxa = arr.searchsorted(a)
-            idxb = arr.searchsorted(b)
-            # arr has a point in interval
-            if idxa != idxb or (idxa < len(arr) and a == arr[idxa]):
-                F += Intervals([a, b])
-        return F
+        if self.is_empty():
+            return Intervals()
+        arr = np.asarray(arr)
+        idxa = arr.searchsorted(self.intervals[:, 0])
+        idxb = arr.searchsorted(self.intervals[:, 1])
+        # arr has a point in interval
+        at_a = np.zeros(idxa.shape, dtype=bool)
+        inside = idxa < len(arr)
+        at_a[inside] = arr[idxa[inside]] == self.intervals[inside, 0]
+        return Intervals._from_sorted(self.intervals[(idxa != idxb) | at_a])
 
     def save(self, filename='Intervals_save'):
         np.savez(filename, intervals=self.intervals)
@@ -280,47 +330,550 @@ class Intervals(object):
         return self
 
     def ASs(self, ISDT=20):
-        """ returns new object of Active States given self as Events """
-        return self.complement().trim(ISDT).complement()
+        """ returns new object of Active States given self as Events
+            (a list of objects, one per threshold, if ISDT is an array) """
+        return self._states(ISDT, active=True)
 
     def ISs(self, ISDT=20):
-        """ returns new object of Inactive States given self as Events """
-        return self.complement().trim(ISDT)
+        """ returns new object of Inactive States given self as Events
+            (a list of objects, one per threshold, if ISDT is an array) """
+        return self._states(ISDT, active=False)
+
+    def _states(self, ISDT, active):
+        """ Active States are the Events joined across the gaps with
+            lengths <= ISDT, Inactive States are their complement; the
+            gaps between Events are computed once for every threshold. """
+        ivt = self.intervals.reshape(-1, 2).astype(np.double)
+        # point events vanish in the complement of the events
+        ivt = ivt[ivt[:, 1] > ivt[:, 0], :]
+        gaps = ivt[1:, 0] - ivt[:-1, 1]
+        states = []
+        for eps in np.atleast_1d(ISDT):
+            ASs = _join(ivt, gaps <= eps)
+            if active:
+                states.append(Intervals._from_sorted(ASs))
+            else:
+                states.append(Intervals._from_sorted(_complement(ASs)))
+        return states[0] if np.ndim(ISDT) == 0 else states
+
+
+def _sweep(ivt):
+    """ Union together the overlapping or touching intervals of an (M x 2)
+        array sorted by start: an interval starts a new group when it
+        begins after every interval before it has ended """
+    if ivt.shape[0] == 0:
+        return np.array([])
+    reach = np.maximum.accumulate(ivt[:, 1])
+    first = np.concatenate(([True], ivt[1:, 0] > reach[:-1]))
+    last = np.concatenate((first[1:], [True]))
+    return np.column_stack((ivt[first, 0], reach[last]))
+
+
+def _sweep_groups(ivt, groups):
+    """ _sweep applied to the intervals of each group of an (M x 2) array
+        sorted by group then start.  Returns the unions and their groups.
+        The running maximum restarts at each group: the stops are
+        replaced by their ranks, shifted so that the ranks of a group
+        exceed the ones of the groups before it. """
+    if ivt.shape[0] == 0:
+        return ivt.reshape(-1, 2), groups
+    stops, rank = np.unique(ivt[:, 1], return_inverse=True)
+    shift = groups.astype(np.int64) * stops.shape[0]
+    reach = stops[np.maximum.accumulate(rank.ravel() + shift) - shift]
+    first = np.concatenate(([True], (groups[1:] != groups[:-1]) |
+                            (ivt[1:, 0] > reach[:-1])))
+    last = np.concatenate((first[1:], [True]))
+    return np.column_stack((ivt[first, 0], reach[last])), groups[first]
+
+
+def _merge_touching(ivt, groups):
+    """ Union together touching intervals of the same group in an (M x 2)
+        array sorted by group then start, whose stops are non-decreasing
+        within a group.  Returns the merged array and its groups. """
+    if ivt.shape[0] == 0:
+        return ivt, groups
+    first = np.concatenate(([True], (groups[1:] != groups[:-1]) |
+                            (ivt[1:, 0] > ivt[:-1, 1])))
+    last = np.concatenate((first[1:], [True]))
+    return (np.column_stack((ivt[first, 0], ivt[last, 1])), groups[first])
+
+
+class OverlapIndex(object):
+    """ Index of the sorted endpoints and prefix sums of the lengths of an
+    Intervals object, answering queries about the intervals overlapping
+    windows [a, b] in O(log n).  a and b may be numbers or arrays of
+    windows.
 
+    parameters
+        intervals: Intervals object, not modified afterwards
+    """
 
-def intervals_from_binary(bin_array, times):
+    def __init__(self, intervals):
+        ivt = intervals.intervals.reshape(-1, 2)
+        self.starts = ivt[:, 0]
+        self.stops = ivt[:, 1]
+        self._intervals = ivt
+        self._prefix = _prefix_measure(ivt)
+
+    def _bounds(self, a, b):
+        """ intervals [lo, hi) overlap [a, b], i.e. stop > a and
+            start < b """
+        lo = self.stops.searchsorted(a, side='right')
+        hi = self.starts.searchsorted(b, side='left')
+        return lo, np.maximum(hi, lo)
+
+    def count(self, a, b):
+        """ Number of intervals overlapping [a, b] """
+        lo, hi = self._bounds(a, b)
+        return hi - lo
+
+    def measure(self, a, b):
+        """ Measure of the intersection of the intervals with [a, b] """
+        a = np.asarray(a, dtype=np.double)
+        b = np.asarray(b, dtype=np.double)
+        cumulative = [_cumulative_measure(
+            self._intervals, self._prefix,
+            self.starts.searchsorted(x, side='right'), 0, x) for x in (a, b)]
+        return np.maximum(cumulative[1] - cumulative[0], 0)
+
+    def first(self, a, b):
+        """ Index of the first interval overlapping [a, b], -1 if none """
+        lo, hi = self._bounds(a, b)
+        return np.where(hi > lo, lo, -1)
+
+    def last(self, a, b):
+        """ Index of the last interval overlapping [a, b], -1 if none """
+        lo, hi = self._bounds(a, b)
+        return np.where(hi > lo, hi - 1, -1)
+
+
+def _prefix_measure(ivt):
+    """ Measures of ivt[:i] for i = 0, ..., M """
+    return np.concatenate(([0], np.cumsum(ivt[:, 1] - ivt[:, 0])))
+
+
+def _cumulative_measure(ivt, prefix, idx, lo, x):
+    """ Measure of the intervals ivt[lo:idx] intersected with [-inf, x],
+        where idx is the number of intervals of ivt starting <= x and
+        prefix = _prefix_measure(ivt) """
+    if ivt.shape[0] == 0:
+        return np.zeros(np.shape(x))
+    # the last interval starting <= x may stop after x
+    partial = np.where(idx > lo, ivt[idx - 1, 1] - x, 0)
+    return prefix[idx] - prefix[lo] - np.maximum(partial, 0)
+
+
+def _complement(ivt):
+    """ Complement of an (M x 2) sorted array of disjoint intervals that
+        are neither points nor touching """
+    if ivt.shape[0] == 0:
+        return np.array([[-np.inf, np.inf]])
+    I = np.column_stack((np.concatenate(([-np.inf], ivt[:, 1])),
+                         np.concatenate((ivt[:, 0], [np.inf]))))
+    # unbounded intervals leave no gap at the ends
+    return I[int(ivt[0, 0] == -np.inf):I.shape[0] - int(ivt[-1, 1] == np.inf)]
+
+
+def _gap_rule(eps):
+    """ Rule joining the gaps with lengths <= eps """
+    return lambda stops, starts: starts - stops <= eps
+
+
+def _join(ivt, join):
+    """ Union together the intervals i and i + 1 of an (M x 2) sorted
+        disjoint array for which join[i] is True """
+    if ivt.shape[0] == 0:
+        return ivt
+    first = np.concatenate(([True], ~join))
+    last = np.concatenate((~join, [True]))
+    return np.column_stack((ivt[first, 0], ivt[last, 1]))
+
+
+def _connect_gaps(ivt, groups, join_rule):
+    """ Connects consecutive intervals of the same group separated by a
+        gap for which join_rule(stops, starts) is True, as
+        Intervals.connect_gaps does: the gaps are the ones of the
+        complement, which skips point intervals, and point intervals
+        falling into a connected gap disappear.
+        Returns None when no gap is connected. """
+    is_point = ivt[:, 1] == ivt[:, 0]
+    idx = np.flatnonzero(~is_point)
+    seg = ivt[idx, :]
+    join = ((groups[idx[1:]] == groups[idx[:-1]]) &
+            np.asarray(join_rule(seg[:-1, 1], seg[1:, 0]), dtype=bool))
+    if not join.any():
+        return None
+    merged = _join(seg, join)
+    merged_groups = groups[idx[np.concatenate(([True], ~join))]]
+    # keep the points lying outside of the connected gaps
+    points = np.flatnonzero(is_point)
+    before = idx.searchsorted(points) - 1
+    kept = points[~np.concatenate((join, [False]))[before]]
+    if kept.shape[0] == 0:
+        return merged, merged_groups
+    ivt = np.vstack((merged, ivt[kept, :]))
+    groups = np.concatenate((merged_groups, groups[kept]))
+    order = np.lexsort((ivt[:, 0], groups))
+    return ivt[order, :], groups[order]
+
+
+class IntervalsCollection(object):
+    """ Finite Unions of Intervals of many members (e.g. the mouse-days
+    of a feature) stored member after member in a single array, so that
+    operations apply to every member in one vectorized call.
+
+    parameters
+        endpoints: (N x 2) numpy np.double array of the sorted disjoint
+            intervals of the members
+        offsets: (M + 1) integer array, the intervals of member i are
+            endpoints[offsets[i]:offsets[i + 1]]
+        keys: list of M keys of the members, default range(M)
     """
-    Given a one dimensional bin_array of 0s and 1s,
-    returns a Intervals object of times corresponding to consecutives 1s
+
+    def __init__(self, endpoints, offsets, keys=None):
+        self.endpoints = np.asarray(endpoints,
+                                    dtype=np.double).reshape(-1, 2)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        if keys is None:
+            keys = range(self.offsets.shape[0] - 1)
+        self.keys = list(keys)
+        if len(self.keys) != self.offsets.shape[0] - 1 or \
+           self.offsets[-1] != self.endpoints.shape[0]:
+            raise ValueError("offsets should have one more element than "
+                             "keys and end with the number of intervals")
+        if not self._is_disjoint():
+            self._make_disjoint()
+
+    @classmethod
+    def from_intervals(cls, list_of_intervals, keys=None):
+        """ New IntervalsCollection holding a copy of each Intervals """
+        ivts = [F.intervals.reshape(-1, 2) for F in list_of_intervals]
+        offsets = np.cumsum([0] + [ivt.shape[0] for ivt in ivts])
+        endpoints = np.vstack(ivts) if len(ivts) else np.zeros((0, 2))
+        return cls(endpoints, offsets, keys)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, i):
+        """ Intervals view (not a copy) of the i-th member """
+        a, b = self.offsets[i], self.offsets[i + 1]
+        return Intervals._from_sorted(self.endpoints[a:b, :])
+
+    def items(self):
+        """ Iterator over the (key, Intervals view) of the members """
+        return zip(self.keys, self)
+
+    def _groups(self):
+        """ Member index of every interval """
+        return np.repeat(np.arange(len(self)), self.num())
+
+    def _set(self, ivt, groups):
+        self.endpoints = ivt
+        self.offsets = np.concatenate(
+            ([0], np.cumsum(np.bincount(groups, minlength=len(self)))))
+
+    def _is_disjoint(self):
+        ivt = self.endpoints
+        groups = self._groups()
+        same = groups[1:] == groups[:-1]
+        return ((ivt[:-1, 1] < ivt[1:, 0]) | ~same).all() and \
+            (ivt[:, 1] >= ivt[:, 0]).all()
+
+    def _make_disjoint(self):
+        """ Remove intervals [a, b] with a > b, then sorts and unions
+            together the intervals of each member, all members at once """
+        good = self.endpoints[:, 1] >= self.endpoints[:, 0]
+        ivt = self.endpoints[good, :]
+        groups = self._groups()[good]
+        order = np.lexsort((ivt[:, 0], groups))
+        self._set(*_sweep_groups(ivt[order, :], groups[order]))
+
+    def copy(self):
+        return IntervalsCollection(self.endpoints.copy(),
+                                   self.offsets.copy(), self.keys)
+
+    def num(self):
+        """ Number of intervals of each member """
+        return np.diff(self.offsets)
+
+    def measure(self):
+        """ Measure of each member """
+        lengths = self.endpoints[:, 1] - self.endpoints[:, 0]
+        return np.bincount(self._groups(), weights=lengths,
+                           minlength=len(self))
+
+    def contains_many(self, times):
+        """ (M x len(times)) boolean matrix telling for each member whether
+            each element of times is in its Finite Union of Intervals.
+            (one searchsorted of all the endpoints into the sorted times,
+            then one cumulative sum marking the covered times) """
+        times = np.asarray(times, dtype=np.double)
+        n = times.shape[0]
+        order = None
+        if (np.diff(times) < 0).any():
+            order = np.argsort(times, kind='mergesort')
+            times = times[order]
+        # the intervals of member i cover the times lo:hi
+        lo = times.searchsorted(self.endpoints[:, 0], side='left')
+        hi = times.searchsorted(self.endpoints[:, 1], side='right')
+        shift = self._groups() * (n + 1)
+        size = len(self) * (n + 1)
+        cover = (np.bincount(shift + lo, minlength=size) -
+                 np.bincount(shift + hi, minlength=size))
+        inside = cover.reshape(len(self), n + 1)[:, :n].cumsum(axis=1) > 0
+        if order is not None:
+            inside[:, order] = inside.copy()
+        return inside
+
+    def measure_per_bin(self, edges):
+        """ (M x bins) matrix of the measure of each member in each bin
+            [edges[i], edges[i + 1]]
+
+            edges: sorted bin edges shared by the members, or (M x bins + 1)
+                array of the edges of each member
+        """
+        n = len(self)
+        edges = np.asarray(edges, dtype=np.double)
+        edges = np.broadcast_to(edges, (n, edges.shape[-1]))
+        if self.endpoints.shape[0] == 0:
+            return np.zeros((n, max(edges.shape[1] - 1, 0)))
+        # number of intervals starting <= each edge, counted within its
+        # member by sorting the starts and the edges together
+        groups = np.concatenate((self._groups(),
+                                 np.repeat(np.arange(n), edges.shape[1])))
+        values = np.concatenate((self.endpoints[:, 0], edges.ravel()))
+        is_edge = np.arange(groups.shape[0]) >= self.endpoints.shape[0]
+        order = np.lexsort((is_edge, values, groups))
+        counts = np.cumsum(~is_edge[order])
+        idx = np.empty(groups.shape[0], dtype=np.int64)
+        idx[order] = counts
+        idx = idx[is_edge].reshape(edges.shape)
+        lo = self.offsets[:-1, np.newaxis]
+        return np.diff(_cumulative_measure(self.endpoints,
+                                           _prefix_measure(self.endpoints),
+                                           idx, lo, edges), axis=1)
+
+    def trim(self, eps=0.001):
+        """ Removes intervals with lengths <= eps from every member. """
+        keep = self.endpoints[:, 1] - self.endpoints[:, 0] > eps
+        self._set(self.endpoints[keep, :], self._groups()[keep])
+        return self
+
+    def connect_gaps(self, eps=0.001):
+        """ connects consecutive intervals separated by lengths <= eps
+            in every member """
+        connected = _connect_gaps(self.endpoints, self._groups(),
+                                  _gap_rule(eps))
+        if connected is not None:
+            self._set(*connected)
+        return self
+
+    def complement(self):
+        """ New IntervalsCollection of the complements of the members. """
+        n = len(self)
+        groups = self._groups()
+        # member i has num[i] + 1 gaps, starting at position offsets[i] + i
+        gap_groups = np.repeat(np.arange(n), self.num() + 1)
+        pos = np.arange(self.endpoints.shape[0]) + groups
+        gaps = np.empty((self.endpoints.shape[0] + n, 2))
+        gaps[self.offsets[:-1] + np.arange(n), 0] = -np.inf
+        gaps[pos + 1, 0] = self.endpoints[:, 1]
+        gaps[pos, 1] = self.endpoints[:, 0]
+        gaps[self.offsets[1:] + np.arange(n), 1] = np.inf
+        # unbounded members have no gap at their ends
+        keep = ~((gaps[:, 0] == gaps[:, 1]) & np.isinf(gaps[:, 0]))
+        complement = IntervalsCollection(np.zeros((0, 2)),
+                                         np.zeros(n + 1), self.keys)
+        complement._set(*_merge_touching(gaps[keep, :], gap_groups[keep]))
+        return complement
+
+    def ASs(self, ISDT=20):
+        """ returns new collection of Active States given self as Events """
+        # point events vanish in the complement of the events
+        return self.copy().trim(0).connect_gaps(ISDT)
+
+    def ISs(self, ISDT=20):
+        """ returns new collection of Inactive States given self as
+            Events """
+        return self.ASs(ISDT).complement()
+
+
+class _Rows(object):
+    """ (M x 2) array growing by doubling its capacity """
+
+    def __init__(self, capacity=64):
+        self._data = np.empty((capacity, 2))
+        self.n = 0
+
+    def append(self, a, b):
+        if self.n == self._data.shape[0]:
+            data = np.empty((2 * self._data.shape[0], 2))
+            data[:self.n] = self._data
+            self._data = data
+        self._data[self.n] = a, b
+        self.n += 1
+
+    def last(self):
+        return self._data[self.n - 1]
+
+    def array(self):
+        return self._data[:self.n].copy()
+
+
+class IntervalsBuilder(object):
+    """ Builds an Intervals object from events appended in order of
+    their start times, e.g. as they are recorded, merging overlapping
+    or touching events as they arrive.
+
+    Active States (see Intervals.ASs) are tracked online: an Active State
+    is closed as soon as an event starts more than ISDT after its end, or
+    when advance(t) tells that no event will start before t.
+
+    parameters
+        ISDT: threshold of the Active States
+        capacity: initial number of events the buffers can hold
     """
-    F = Intervals()
-    idx = 0
-    while idx < bin_array.shape[0]:
-        curr_bit = bin_array[idx]
-        if curr_bit == 0:
-            idx += 1
+
+    def __init__(self, ISDT=20, capacity=64):
+        self.ISDT = ISDT
+        self._events = _Rows(capacity)
+        self._closed = _Rows(capacity)
+        # current Active State, None if there is none
+        self._active = None
+        # last event is a point interval, not part of an Active State
+        self._point = False
+        self._time = -np.inf
+
+    def __len__(self):
+        return self._events.n
+
+    def append(self, start, stop):
+        """ Adds the event [start, stop]; start must be at least the
+            start of the previous event.
+            Returns the list of the [start, stop] Active States closed
+            by the event. """
+        if stop < start:
+            raise ValueError("stop should be at least start")
+        if start < self._time:
+            raise ValueError("events should be appended in order of "
+                             "their start times")
+        self._time = start
+        events = self._events
+        if events.n and start <= events.last()[1]:
+            last = events.last()
+            last[1] = max(last[1], stop)
+            if not self._point:
+                self._active[1] = max(self._active[1], stop)
+                return []
+            if last[1] == last[0]:
+                return []
+            start, stop = last
         else:
-            AS_idx = idx + 1
-            start_idx = idx
-            while AS_idx < bin_array.shape[0] and bin_array[AS_idx] == 1:
-                AS_idx += 1
-            F = F.union(Intervals([times[start_idx], times[AS_idx - 1]]))
-            idx = AS_idx
-    return F
+            events.append(start, stop)
+        self._point = stop == start
+        if self._point:
+            return []
+        return self._activate(start, stop)
+
+    def _activate(self, start, stop):
+        """ Adds the non point event [start, stop] to the Active States """
+        closed = []
+        if self._active is not None:
+            if start - self._active[1] <= self.ISDT:
+                self._active[1] = max(self._active[1], stop)
+                return closed
+            closed = self._close()
+        self._active = [start, stop]
+        return closed
+
+    def _close(self):
+        a, b = self._active
+        self._closed.append(a, b)
+        self._active = None
+        return [[a, b]]
+
+    def advance(self, t):
+        """ Tells that no event will start before time t.
+            Returns the list of the [start, stop] Active States that can
+            no longer be extended. """
+        if t < self._time:
+            raise ValueError("time cannot go backwards")
+        self._time = t
+        if self._active is not None and t - self._active[1] > self.ISDT:
+            return self._close()
+        return []
+
+    def finalize(self):
+        """ New Intervals object of the events appended so far """
+        return Intervals._from_sorted(self._events.array())
+
+    def ASs(self):
+        """ New Intervals object of the Active States so far, the last
+            one possibly still open; equals finalize().ASs(ISDT) """
+        ASs = self._closed.array()
+        if self._active is not None:
+            ASs = np.vstack((ASs, [self._active]))
+        return Intervals._from_sorted(ASs)
+
+    def ISs(self):
+        """ New Intervals object of the Inactive States so far; equals
+            finalize().ISs(ISDT) """
+        return Intervals._from_sorted(_complement(self.ASs().intervals
+                                                  .reshape(-1, 2)))
 
 
-def binary_from_intervals(intervals, length=None):
-    """ From an intervals object produce a binary sequence of size length """
+def intervals_from_binary(bin_array, times):
+    """
+    Given a one dimensional bin_array of 0s and 1s,
+    returns a Intervals object of times corresponding to consecutives 1s
+    (runs are found from the edges of np.diff)
+    """
+    bits = np.concatenate(([0], np.asarray(bin_array) != 0, [0]))
+    edges = np.diff(bits.astype(np.int8))
+    starts = np.flatnonzero(edges == 1)
+    stops = np.flatnonzero(edges == -1) - 1
+    if starts.shape[0] == 0:
+        return Intervals()
+    times = np.asarray(times)
+    return Intervals(np.column_stack((times[starts], times[stops])))
+
+
+def binary_from_intervals(intervals, length=None, dtype=np.double,
+                          out=None, chunk_size=2 ** 20):
+    """ From an intervals object produce a binary sequence of size length
+        sampled at np.linspace(start, end, length)
+
+        dtype: type of the returned sequence
+        out: preallocated array of shape (length,) to write the sequence
+            into, e.g. a np.memmap; length defaults to its size
+        chunk_size: number of samples computed at a time, bounding the
+            temporary memory used for large sequences
+    """
     if length is None:
-        length = int(intervals.intervals[-1, 1] - intervals.intervals[0, 0])
-    binary = np.zeros(length)
+        if out is not None:
+            length = out.shape[0]
+        else:
+            length = int(intervals.intervals[-1, 1] -
+                         intervals.intervals[0, 0])
+    if out is None:
+        out = np.zeros(length, dtype=dtype)
+    elif out.shape != (length,):
+        raise ValueError("out should have shape ({},)".format(length))
     start = intervals.intervals[0, 0]
     end = intervals.intervals[-1, 1]
-    arr = np.linspace(start, end, length)
-    for c, time in enumerate(arr):
-        if intervals.contains(time):
-            binary[c] = 1
-    return binary
+    # same samples as np.linspace(start, end, length)
+    step = (end - start) / max(length - 1, 1)
+    for i in range(0, length, chunk_size):
+        arr = np.arange(i, min(i + chunk_size, length)) * step + start
+        if i + chunk_size >= length and length > 1:
+            arr[-1] = end
+        out[i:i + arr.shape[0]] = intervals.contains_many(arr)
+    return out
 
 
 def timestamps_to_interval(array, eps=.01):
@@ -328,6 +881,6 @@ def timestamps_to_interval(array, eps=.01):
             on timestamp and eps wide.
             default 0.01 is half of minimum HCM sampling rate
     """
-    new_arr = zip(array - eps, array + eps)
-    new_I = Intervals(new_arr)
+    array = np.asarray(array)
+    new_I = Intervals(np.column_stack((array - eps, array + eps)))
     return new_I
@@ -7,7 +7,8 @@ import numpy as np
 from scipy.stats import mannwhitneyu
 import matplotlib.pyplot as plt
 
-from mousestyles.data import distances_bymouse, distances_bystrain
+from mousestyles.data import (distances_bymouse, distances_bystrain,
+                              load_catalog)
 
 
 def get_pvalues(m):
@@ -83,17 +84,14 @@ def MWW_mice(strain, step=50, verbose=False):
     ---------
     >>> cor = MWW_mice(0)
     """
-    mouse = 0
     res = []
-    dist = np.array([0])
-    while dist.size > 0:
+    for mouse in load_catalog().mice(strain):
         dist = distances_bymouse(strain, mouse,
                                  step=step)
         res.append(dist)
-        mouse += 1
         if verbose:
-            print('mouse %s done.' % mouse)
-    cor = get_pvalues(res[:-1])
+            print('mouse %s done.' % (mouse + 1))
+    cor = get_pvalues(res)
     return cor
 
 
@@ -115,16 +113,12 @@ def MWW_allmice(step=50, verbose=False):
     ---------
     >>> mww_values = MWW_allmice()
     """
-    strain = 0
-    mww = np.array([0])
     mww_values = []
-    while mww.size > 0:
+    for strain in load_catalog().strains():
         mww = MWW_mice(strain, verbose=False)
         mww_values.append(mww)
         if verbose:
             print('strain %s done.' % strain)
-        strain += 1
-    mww_values = mww_values[:-1]
     return mww_values
 
 
@@ -149,17 +143,14 @@ def MWW_strains(step=50, verbose=False):
     ---------
     >>> cor = MWW_strains()
     """
-    strain = 0
     res = []
-    dist = np.array([0])
-    while dist.size > 0:
+    for strain in load_catalog().strains():
         dist = distances_bystrain(strain,
                                   step=step)
         res.append(dist)
         if verbose:
             print('strain %s done.' % strain)
-        strain += 1
-    cor = get_pvalues(res[:-1])
+    cor = get_pvalues(res)
     return cor
 
 
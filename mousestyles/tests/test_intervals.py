@@ -1,11 +1,194 @@
 from __future__ import (absolute_import, division,
                         print_function, unicode_literals)
 
+import math
+
+import numpy as np
+import pytest
+
 import mousestyles.data as data
-from mousestyles.intervals import Intervals
+from mousestyles.intervals import (Intervals, IntervalsCollection,
+                                   IntervalsBuilder,
+                                   intervals_from_binary,
+                                   binary_from_intervals,
+                                   timestamps_to_interval)
 
 
 def test_intervals():
     # This is a place holder.  Not sure this is correct.
     all_features = data.load_all_features()
     assert Intervals(all_features).measure() == 11.0
+
+
+def test_contains_many():
+    ints = Intervals(np.array([[0, 1], [2, 2], [3.5, 5], [7, np.inf]]))
+    times = np.array([-1, 0, 0.5, 1, 1.5, 2, 2.5, 3.5, 5, 6, 7, 1e9])
+    expected = np.array([ints.contains(t) for t in times])
+    assert np.array_equal(ints.contains_many(times), expected)
+    assert not Intervals().contains_many(times).any()
+    assert ints.contains_many(np.zeros((2, 3))).shape == (2, 3)
+
+
+def test_make_disjoint():
+    ints = Intervals(np.array([[5, 6], [0, 2], [1, 3], [3, 4], [4, 4],
+                               [8, 8], [7, 1], [5.5, 5.7]]))
+    expected = np.array([[0, 4], [5, 6], [8, 8]])
+    assert np.array_equal(ints.intervals, expected)
+    # every interval has its start after its stop
+    assert Intervals(np.array([[1, 0], [3, 2]])).is_empty()
+
+
+def test_set_algebra():
+    A = Intervals(np.array([[0, 2], [3, 3], [4, 6], [8, 10]]))
+    B = Intervals(np.array([[1, 4], [5, 5], [6, 9]]))
+    assert np.array_equal((A * B).intervals, [[1, 2], [8, 9]])
+    assert np.array_equal((A + B).intervals, [[0, 10]])
+    assert np.array_equal((A - B).intervals, [[0, 1], [4, 6], [9, 10]])
+    assert np.array_equal(A.symmetric_difference(B).intervals,
+                          [[0, 1], [2, 8], [9, 10]])
+    assert (A * Intervals([10, 12])).is_empty()
+    union = Intervals.union_all([A, Intervals(), B, Intervals([12, 13])])
+    assert np.array_equal(union.intervals, [[0, 10], [12, 13]])
+    assert Intervals.union_all([]).is_empty()
+
+
+def test_binary_round_trip():
+    bits = np.array([1, 1, 0, 0, 1, 0, 1, 1, 1])
+    ints = intervals_from_binary(bits, np.arange(9.))
+    assert np.array_equal(ints.intervals, [[0, 1], [4, 4], [6, 8]])
+    assert intervals_from_binary(np.zeros(4), np.arange(4.)).is_empty()
+    assert np.array_equal(binary_from_intervals(ints, 9), bits)
+    out = np.ones(9, dtype=bool)
+    binary = binary_from_intervals(ints, dtype=bool, out=out, chunk_size=2)
+    assert binary is out
+    assert np.array_equal(out, bits)
+
+
+def test_intervals_collection():
+    members = [Intervals(np.array([[0, 1], [2, 2], [3, 5], [30, 31]])),
+               Intervals(),
+               Intervals(np.array([[-np.inf, 4], [10, 12]]))]
+    collection = IntervalsCollection.from_intervals(members, keys='abc')
+    assert np.array_equal(collection.num(), [4, 0, 2])
+    assert np.array_equal(collection.measure(), [4, 0, np.inf])
+    for (key, F) in zip('abc', [F.ISs(5) for F in members]):
+        assert np.array_equal(dict(collection.ISs(5).items())[key].intervals,
+                              F.intervals.reshape(-1, 2))
+    for (F, G) in zip(members, collection.copy().connect_gaps(2)):
+        assert np.array_equal(F.copy().connect_gaps(2).intervals.ravel(),
+                              G.intervals.ravel())
+    assert np.array_equal(collection.ASs(5)[0].intervals, [[0, 5], [30, 31]])
+    assert np.array_equal(collection.trim(1).num(), [1, 0, 2])
+    # members are sorted and made disjoint
+    collection = IntervalsCollection(np.array([[3, 4], [0, 5], [1, 0]]),
+                                     [0, 2, 3])
+    assert np.array_equal(collection[0].intervals, [[0, 5]])
+    assert collection[1].is_empty()
+
+
+def test_intervals_collection_contains_many():
+    members = [Intervals(np.array([[0, 1], [2, 2], [3, 5]])),
+               Intervals(),
+               Intervals(np.array([[-np.inf, 0.5], [4, 12]]))]
+    collection = IntervalsCollection.from_intervals(members)
+    for times in [np.array([-1, 0, 1, 1.5, 2, 4, 5, 6]),
+                  np.array([6, 2, -1, 0.5, 12.5])]:
+        inside = collection.contains_many(times)
+        assert inside.shape == (3, times.shape[0])
+        for (F, row) in zip(members, inside):
+            assert np.array_equal(F.contains_many(times), row)
+
+
+def test_connect_gaps():
+    ints = Intervals(np.array([[0, 1], [2, 2], [2.5, 3], [6, 7], [7.5, 7.5]]))
+    assert np.array_equal(ints.copy().connect_gaps(1.5).intervals,
+                          [[0, 3], [6, 7], [7.5, 7.5]])
+    # unlike connect_gaps, the rule sees the gaps around point intervals
+    assert np.array_equal(ints.connect_gaps_by_rule(0.5).intervals,
+                          [[0, 1], [2, 3], [6, 7.5]])
+    rule = lambda stops, starts: starts - stops > 2  # noqa
+    assert np.array_equal(ints.connect_gaps_by_rule(rule,
+                                                    vectorized=True).intervals,
+                          [[0, 1], [2, 2], [2.5, 7], [7.5, 7.5]])
+
+    # rules are called once per gap by default
+    calls = []
+
+    def scalar_rule(stop, start):
+        calls.append(stop)
+        return math.floor(start) - math.floor(stop) > 2 and start > 0
+
+    assert np.array_equal(ints.connect_gaps_by_rule(scalar_rule).intervals,
+                          [[0, 1], [2, 2], [2.5, 7], [7.5, 7.5]])
+    assert len(calls) == 4
+    # vectorized rules may return integers
+    rule = lambda stops, starts: (starts - stops > 2).astype(int)  # noqa
+    assert np.array_equal(ints.connect_gaps_by_rule(rule,
+                                                    vectorized=True).intervals,
+                          [[0, 1], [2, 2], [2.5, 7], [7.5, 7.5]])
+    assert Intervals([-np.inf, np.inf]).connect_gaps().num() == 1
+
+
+def test_timestamps_to_interval():
+    ints = timestamps_to_interval(np.array([1, 1.01, 3]), eps=0.01)
+    assert np.allclose(ints.intervals, [[0.99, 1.02], [2.99, 3.01]])
+    sub = ints.subordinate_to_array([1, 5])
+    assert np.allclose(sub.intervals, [[0.99, 1.02]])
+    assert ints.subordinate_to_array([]).is_empty()
+    assert timestamps_to_interval(np.array([])).is_empty()
+
+
+def test_measure_per_bin():
+    ints = Intervals(np.array([[0, 1.5], [2, 2], [2.5, 5]]))
+    edges = np.array([-1, 1, 2, 4, 10])
+    assert np.allclose(ints.measure_per_bin(edges), [1, 0.5, 1.5, 1])
+    assert np.array_equal(Intervals().measure_per_bin(edges), np.zeros(4))
+    collection = IntervalsCollection.from_intervals([Intervals(), ints])
+    assert np.allclose(collection.measure_per_bin(edges),
+                       [[0, 0, 0, 0], [1, 0.5, 1.5, 1]])
+    per_member = collection.measure_per_bin([[0, 1, 2], [2, 3, 4]])
+    assert np.allclose(per_member, [[0, 0], [0.5, 1]])
+
+
+def test_overlap_index():
+    ints = Intervals(np.array([[0, 1], [2, 2], [3, 5], [7, 9]]))
+    index = ints.overlap_index()
+    a, b = np.array([-2, 0.5, 1, 5, 10]), np.array([-1, 3.5, 3, 8, 11])
+    assert np.array_equal(index.count(a, b), [0, 3, 1, 1, 0])
+    assert np.allclose(index.measure(a, b), [0, 1, 0, 1, 0])
+    assert np.array_equal(index.first(a, b), [-1, 0, 1, 3, -1])
+    assert np.array_equal(index.last(a, b), [-1, 2, 1, 3, -1])
+    assert index.count(4, 8) == ints.intersect_with_interval(4, 8).num()
+    assert Intervals().overlap_index().measure(0, 1) == 0
+
+
+def test_active_states():
+    events = Intervals(np.array([[0, 1], [2, 2], [3, 4], [30, 31]]))
+    assert np.array_equal(events.ASs(5).intervals, [[0, 4], [30, 31]])
+    assert np.array_equal(events.ISs(5).intervals,
+                          [[-np.inf, 0], [4, 30], [31, np.inf]])
+    ASs = events.ASs(np.array([1, 2, 50]))
+    assert [F.num() for F in ASs] == [3, 2, 1]
+    ISs = events.ISs([1, 50])
+    assert np.array_equal(ISs[1].intervals, [[-np.inf, 0], [31, np.inf]])
+    assert Intervals().ASs(5).is_empty()
+    assert Intervals().ISs(5).measure() == np.inf
+
+
+def test_intervals_builder():
+    builder = IntervalsBuilder(ISDT=5, capacity=1)
+    assert builder.append(0, 1) == []
+    assert builder.append(0.5, 2) == []
+    assert builder.append(3, 3) == []
+    assert builder.append(4, 6) == []
+    assert builder.advance(10) == []
+    assert builder.advance(12) == [[0, 6]]
+    assert builder.append(20, 21) == []
+    events = builder.finalize()
+    assert np.array_equal(events.intervals, [[0, 2], [3, 3], [4, 6], [20, 21]])
+    assert np.array_equal(builder.ASs().intervals, events.ASs(5).intervals)
+    assert np.array_equal(builder.ISs().intervals, events.ISs(5).intervals)
+    with pytest.raises(ValueError):
+        builder.append(19, 22)
+    with pytest.raises(ValueError):
+        builder.append(30, 29)
@@ -59,44 +59,16 @@ def aggregate_interval(strain, mouse, feature, bin_width):
             'Bin width (minutes) must be a non-negative integer below 1440')
 
     # load data
-    intervals = data.load_intervals(feature)
-    mouse_data = intervals.loc[
-        (intervals['strain'] == strain) & (intervals['mouse'] == mouse)]
+    intervals = data.load_intervals_collection(feature, strain=strain,
+                                               mouse=mouse)
 
-    # build data frame
-    days = sorted(np.unique(mouse_data['day']))
+    # covered time in the bins of each day, starting at its recording start
     bin_count = int(24 * 60 / bin_width)
-    time_behaviour = np.repeat(0.0, bin_count * len(days))
     bin_length = bin_width * 60
-
-    for j in days:
-        df = mouse_data.loc[mouse_data['day'] == j]
-        start_end = data.load_start_time_end_time(strain, mouse, j)
-        start = np.asarray(df['start']) - start_end[0]
-        end = np.asarray(df['stop']) - start_end[0]
-
-        for i in range(len(start)):
-            start_time = start[i]
-            end_time = end[i]
-            start_index = int(start_time / (bin_width * 60))
-            end_index = int(end_time / (bin_width * 60))
-            if start_index == end_index:
-                time_behaviour[start_index + j *
-                               bin_count] += end_time - start_time
-            elif end_index - start_index == 1:
-                time_behaviour[
-                    start_index + j *
-                    bin_count] += bin_length * end_index - start_time
-                time_behaviour[end_index + j *
-                               bin_count] += end_time % bin_length
-            else:
-                time_behaviour[
-                    start_index + j *
-                    bin_count] += bin_length * (start_index + 1) - start_time
-                time_behaviour[end_index + j *
-                               bin_count] += end_time % bin_length
-                time_behaviour[start_index + j * bin_count +
-                               1:end_index + j * bin_count] += bin_length
+    starts = np.array([data.load_start_time_end_time(strain, mouse, day)[0]
+                       for (_, _, day) in intervals.keys])
+    edges = starts[:, np.newaxis] + np.arange(bin_count + 1) * bin_length
+    time_behaviour = intervals.measure_per_bin(edges).ravel()
 
     if feature == 'F' or feature == 'W':
         all_feature = data.load_all_features()
@@ -163,18 +135,15 @@ def aggregate_movement(strain, mouse, bin_width):
             'Bin width (minutes) must be a non-negative integer below 1440')
 
     # determine number of days
-    intervals = data.load_intervals('IS')
-    mouse_data = intervals.loc[
-        (intervals['strain'] == strain) & (intervals['mouse'] == mouse)]
-    days = sorted(np.unique(mouse_data['day']))
+    keys = data.load_catalog().keys(strain, mouse)
+    days = [day for (_, _, day) in keys]
 
     # build data frame
     bin_count = int(24 * 60 / bin_width)
     time_movements = np.repeat(0.0, bin_count * len(days))
     bin_length = bin_width * 60
 
-    for j in days:
-        M = data.load_movement(strain, mouse, day=int(j))
+    for ((_, _, j), M) in data.load_movements(keys):
         distance_df = pd.DataFrame({"start": M["t"].values[0:-1],
                                     "end": M["t"].values[1:],
                                     "distance":
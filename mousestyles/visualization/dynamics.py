@@ -10,7 +10,8 @@ from mousestyles.dynamics import find_best_interval
 
 def plot_dynamics(df, strain_num,
                   interval_length_initial=np.arange(600, 7800, 600),
-                  plot_time_range=np.arange(36000, 36100, 1)):
+                  plot_time_range=np.arange(36000, 36100, 1),
+                  n_jobs=1, seed=0):
     r"""
     returns a plot that can help understand the
     behavior dynamics that are obtained from the best
@@ -40,6 +41,11 @@ def plot_dynamics(df, strain_num,
     plot_time_range: numpy.ndarray
         a numpy.ndarray specifying the range of time range
         of the plot.
+    n_jobs: positive int
+        the number of processes fitting the candidate intervals
+    seed: int
+        the seed of the simulation; the fit of find_best_interval
+        with the same data, candidates and seed is reused.
 
     Returns
     -------
@@ -87,7 +93,10 @@ def plot_dynamics(df, strain_num,
     if not condition_plot_time_range:
         raise ValueError("plot_time_range positive np.array")
 
-    value_array = find_best_interval(df, strain_num)[1][plot_time_range]
+    best_fake_mouse = find_best_interval(df, strain_num,
+                                         interval_length_initial,
+                                         n_jobs=n_jobs, seed=seed)[1]
+    value_array = best_fake_mouse[plot_time_range]
     value_list = list(value_array)
     time_list = list(plot_time_range)
     fig, dynamics_plot = plt.subplots(figsize=(6, 1))